@@ -7,8 +7,276 @@
 # from Hilpisch, Yves (2014): Python for Finance, O'Reilly.
 #
 from math import log, sqrt, exp
+import numpy as np
+import pandas as pd
 from scipy import stats
 from scipy.optimize import fsolve
+from scipy.special import ndtr, ndtri
+
+
+#
+# Closed-Form Implied Volatility
+#
+
+def _normalized_call(x, s):
+    ''' Normalized (undiscounted, per sqrt(F * K)) BSM call value
+    for log-moneyness x = log(F / K) and total volatility s. '''
+    d1 = x / s + s / 2
+    d2 = d1 - s
+    b = np.exp(x / 2) * ndtr(d1) - np.exp(-x / 2) * ndtr(d2)
+    return b, d1, d2
+
+
+def imp_vol_rational(S0, K, T, r, C0, steps=2):
+    ''' Return implied volatilities of European call options without
+    a general-purpose root finder.
+
+    The quotes are normalized and mapped to their out-of-the-money
+    counterparts via put-call parity. A closed-form approximation of the
+    total volatility s = sigma * sqrt(T) is then evaluated on one of three
+    branches around the inflection point s_c = sqrt(2 |x|): the asymptotic
+    lower-tail form 2 pi |x| / (3 sqrt(3)) * N(-|x| / (sqrt(3) s)) ** 3
+    (rescaled to match the branch boundary), the tangent at s_c, and the
+    large-volatility form. The approximation is refined with a small
+    number of third-order Householder steps, on log prices below s_c and
+    on prices above it.
+
+    Parameters
+    ==========
+    S0 : float or array
+        initial stock/index level
+    K : float or array
+        strike price
+    T : float or array
+        time-to-maturity (in year fractions)
+    r : float or array
+        constant risk-free short rate
+    C0 : float or array
+        call option quotes
+    steps : int
+        number of Householder refinements
+
+    Returns
+    =======
+    imp_vol : float or array
+        implied volatilities (NaN for quotes without a solution)
+    '''
+    S0, K, T, r, C0 = np.broadcast_arrays(
+        *[np.asarray(a, dtype=float) for a in (S0, K, T, r, C0)])
+    F = S0 * np.exp(r * T)
+    D = np.exp(-r * T)
+    x = np.log(F / K)
+    beta = C0 / (D * np.sqrt(F * K))
+    # out-of-the-money quote via put-call parity, then x <= 0
+    beta = np.where(x > 0, beta - (np.exp(x / 2) - np.exp(-x / 2)), beta)
+    x = -np.abs(x)
+    ax = np.abs(x)
+    sq2pi = sqrt(2 * np.pi)
+
+    with np.errstate(all='ignore'):
+        # branch boundaries: inflection point s_c and its tangent root s_l
+        s_c = np.sqrt(2 * ax)
+        b_c, d1, d2 = _normalized_call(x, s_c)
+        v_c = np.exp(x / 2) * np.exp(-0.5 * d1 ** 2) / sq2pi
+        s_l = np.maximum(s_c - b_c / v_c, 1e-300)
+        b_l, d1, d2 = _normalized_call(x, s_l)
+
+        def lower_tail(b):
+            z = (3 * sqrt(3) * b / (2 * np.pi * ax)) ** (1 / 3.)
+            return -ax / (sqrt(3) * ndtri(z))
+
+        s_low = lower_tail(beta)
+        s_low_l = lower_tail(b_l)
+        s_low = s_low * (1 + (s_l / s_low_l - 1) * s_low / s_low_l)
+        s_mid = s_c + (beta - b_c) / v_c
+        e = np.exp(x / 2) + np.exp(-x / 2)
+        s_high = 2 * ndtri((beta + np.exp(-x / 2)) / e)
+
+        lower = beta < b_c
+        s = np.where(lower, np.where(beta < b_l, s_low, s_mid), s_high)
+        s = np.where(np.isfinite(s) & (s > 0), s, s_c)
+
+        for _ in range(steps):
+            b, d1, d2 = _normalized_call(x, s)
+            v = np.exp(x / 2) * np.exp(-0.5 * d1 ** 2) / sq2pi
+            v2 = v * d1 * d2 / s
+            v3 = v / s ** 2 * (d1 * d2 * (d1 * d2 - 1) - d1 ** 2 - d2 ** 2)
+            # objective log(b) - log(beta) on the lower branch
+            g1 = v / b
+            g2 = v2 / b - g1 ** 2
+            g3 = v3 / b - 3 * v * v2 / b ** 2 + 2 * g1 ** 3
+            f = np.where(lower, np.log(b) - np.log(beta), b - beta)
+            f1 = np.where(lower, g1, v)
+            f2 = np.where(lower, g2, v2)
+            f3 = np.where(lower, g3, v3)
+            s_new = s - ((6 * f * f1 ** 2 - 3 * f ** 2 * f2)
+                         / (6 * f1 ** 3 - 6 * f * f1 * f2 + f ** 2 * f3))
+            s = np.where(np.isfinite(s_new) & (s_new > 0), s_new, s)
+
+        imp_vol = s / np.sqrt(T)
+    valid = (beta > 0) & (beta < np.exp(x / 2))
+    imp_vol = np.where(valid, imp_vol, np.nan)
+    return imp_vol[()]
+
+
+def _array_field(name):
+    ''' Property exposing one input array of an OptionChain (as a
+    read-only view, so that every change goes through fset or set_row
+    and invalidates the caches). '''
+    def fget(self):
+        view = getattr(self, '_' + name).view()
+        view.flags.writeable = False
+        return view
+
+    def fset(self, value):
+        field = getattr(self, '_' + name)
+        field[:] = np.asarray(value, dtype=field.dtype)
+        self.invalidate(ttm=name in OptionChain._date_fields)
+    return property(fget, fset)
+
+
+class OptionChain(object):
+    ''' Array-backed chain of European call options in BSM Model
+    (struct of arrays, one row per option).
+
+    Attributes
+    ==========
+    S0 : array
+        initial stock/index levels
+    K : array
+        strike prices
+    t : datetime64 array
+        pricing dates
+    M : datetime64 array
+        maturity dates
+    r : array
+        constant risk-free short rates
+    sigma : array
+        volatility factors in diffusion term
+    T : array
+        times-to-maturity (cached)
+
+    Scalars are broadcast to the length of the chain. The attributes
+    are read-only arrays; assigning to an attribute, set_row or a row
+    via an option view invalidates the cached times-to-maturity and
+    d1 values.
+
+    Methods
+    =======
+    value : array
+        return present values of call options
+    vega : array
+        return vegas of call options
+    imp_vol : array
+        return implied volatilities given option quotes
+    '''
+
+    _float_fields = ['S0', 'K', 'r', 'sigma']
+    _date_fields = ['t', 'M']
+
+    S0 = _array_field('S0')
+    K = _array_field('K')
+    t = _array_field('t')
+    M = _array_field('M')
+    r = _array_field('r')
+    sigma = _array_field('sigma')
+
+    def __init__(self, S0, K, t, M, r, sigma):
+        values = dict(S0=S0, K=K, t=t, M=M, r=r, sigma=sigma)
+        for name in self._date_fields:
+            values[name] = np.asarray(values[name], dtype='datetime64[ns]')
+        for name in self._float_fields:
+            values[name] = np.asarray(values[name], dtype=float)
+        shape = np.broadcast(*values.values()).shape
+        if len(shape) > 1:
+            raise ValueError("Option chain inputs must be one-dimensional.")
+        for name, value in values.items():
+            self.__dict__['_' + name] = np.broadcast_to(value, shape).copy()
+        self._T = None
+        self._d1 = None
+
+    def __len__(self):
+        return len(self._S0)
+
+    def __getitem__(self, index):
+        ''' Return a call_option view onto one row. '''
+        return call_option.from_chain(self, index)
+
+    def invalidate(self, ttm=True):
+        ''' Drops cached values (and times-to-maturity if ttm). '''
+        self._d1 = None
+        if ttm:
+            self._T = None
+
+    def set_row(self, index, **kwargs):
+        ''' Updates single entries and invalidates the caches. '''
+        for name, value in kwargs.items():
+            getattr(self, '_' + name)[index] = value
+        self.invalidate(ttm=any(n in self._date_fields for n in kwargs))
+
+    def update_ttm(self):
+        ''' Updates and returns times-to-maturity self.T. '''
+        if np.any(self._t > self._M):
+            raise ValueError("Pricing date later than maturity.")
+        return self.T
+
+    @property
+    def T(self):
+        if self._T is None:
+            days = (self._M - self._t) // np.timedelta64(1, 'D')
+            self._T = days / 365.
+        return self._T
+
+    def d1(self):
+        ''' Helper function (cached). '''
+        if self._d1 is None:
+            T = self.update_ttm()
+            self._d1 = ((np.log(self._S0 / self._K)
+                + (self._r + 0.5 * self._sigma ** 2) * T)
+                / (self._sigma * np.sqrt(T)))
+        return self._d1
+
+    def value(self):
+        ''' Return option values. '''
+        d1 = self.d1()
+        d2 = d1 - self._sigma * np.sqrt(self._T)
+        value = (self._S0 * ndtr(d1)
+            - self._K * np.exp(-self._r * self._T) * ndtr(d2))
+        return value
+
+    def vega(self):
+        ''' Return Vegas of options. '''
+        d1 = self.d1()
+        vega = (self._S0 * np.exp(-0.5 * d1 ** 2) / sqrt(2 * np.pi)
+            * np.sqrt(self._T))
+        return vega
+
+    def imp_vol(self, C0, sigma_est=0.2, method='rational'):
+        ''' Return implied volatilities given option prices.
+
+        method 'rational' inverts all quotes at once, method 'fsolve'
+        solves row by row as in call_option.imp_vol.
+        '''
+        C0 = np.broadcast_to(np.asarray(C0, dtype=float), (len(self),))
+        if method == 'rational':
+            return imp_vol_rational(self._S0, self._K, self.update_ttm(),
+                                    self._r, C0)
+        return np.array([self[i].imp_vol(C0[i], sigma_est, method)
+                         for i in range(len(self))])
+
+
+def _chain_field(name):
+    ''' Property reading/writing one field of a call_option's row. '''
+    def fget(self):
+        value = getattr(self.chain, '_' + name)[self.index]
+        if name in OptionChain._date_fields:
+            return pd.Timestamp(value)
+        return float(value)
+
+    def fset(self, value):
+        self.chain.set_row(self.index, **{name: value})
+    return property(fget, fset)
+
 
 class call_option(object):
     ''' Class for European call options in BSM Model.
@@ -36,21 +304,40 @@ class call_option(object):
         return vega of call option
     imp_vol : float
         return implied volatility given option quote
+        (method 'fsolve' or 'rational')
+
+    The attributes are stored in a one-row OptionChain; options obtained
+    via OptionChain[i] are views onto row i of a larger chain.
     '''
-    
+
+    S0 = _chain_field('S0')
+    K = _chain_field('K')
+    t = _chain_field('t')
+    M = _chain_field('M')
+    r = _chain_field('r')
+    sigma = _chain_field('sigma')
+
     def __init__(self, S0, K, t, M, r, sigma):
-        self.S0 = float(S0)
-        self.K = K
-        self.t = t
-        self.M = M
-        self.r = r
-        self.sigma = sigma
+        self.chain = OptionChain([float(S0)], K, t, M, r, sigma)
+        self.index = 0
+
+    @classmethod
+    def from_chain(cls, chain, index):
+        ''' Returns a view onto row index of chain. '''
+        option = cls.__new__(cls)
+        option.chain = chain
+        option.index = index
+        return option
+
+    @property
+    def T(self):
+        return float(self.chain.T[self.index])
 
     def update_ttm(self):
         ''' Updates time-to-maturity self.T. '''
         if self.t > self.M:
             raise ValueError("Pricing date later than maturity.")
-        self.T = (self.M - self.t).days / 365.
+        return self.T
 
     def d1(self):
         ''' Helper function. '''
@@ -77,13 +364,23 @@ class call_option(object):
         vega = self.S0 * stats.norm.pdf(d1, 0.0, 1.0) * sqrt(self.T)
         return vega
 
-    def imp_vol(self, C0, sigma_est=0.2):
-        ''' Return implied volatility given option price. '''
+    def imp_vol(self, C0, sigma_est=0.2, method='fsolve'):
+        ''' Return implied volatility given option price.
+
+        method 'fsolve' is the numerical reference, method 'rational'
+        uses the closed-form approximation of imp_vol_rational.
+        '''
+        if method == 'rational':
+            self.update_ttm()
+            return float(imp_vol_rational(self.S0, self.K, self.T,
+                                          self.r, C0))
+        if method != 'fsolve':
+            raise ValueError("Unknown implied volatility method.")
         option = call_option(self.S0, self.K, self.t, self.M,
                              self.r, sigma_est)
         option.update_ttm()
         def difference(sigma):
-            option.sigma = sigma
+            option.sigma = sigma[0]
             return option.value() - C0
         iv = fsolve(difference, sigma_est)[0]
-        return iv
\ No newline at end of file
+        return iv
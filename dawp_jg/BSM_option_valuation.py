@@ -10,6 +10,7 @@ import numpy as np
 import matplotlib as mpl
 import matplotlib.pyplot as plt
 from scipy.integrate import quad
+from scipy.special import ndtr
 mpl.rcParams['font.family'] = 'serif'
 
 #
@@ -19,19 +20,29 @@ mpl.rcParams['font.family'] = 'serif'
 
 def dN(x):
     ''' Probability density function of standard normal random variable x. '''
-    return math.exp(-0.5 * x ** 2) / math.sqrt(2 * math.pi)
+    return np.exp(-0.5 * np.square(x)) / math.sqrt(2 * math.pi)
 
 
-def N(d):
-    ''' Cumulative density function of standard normal random variable x. '''
-    return quad(lambda x: dN(x), -20, d, limit=50)[0]
+def N_quad(d):
+    ''' Cumulative density function of standard normal random variable x,
+    integrated numerically (exact reference for N). '''
+    return np.vectorize(
+        lambda d: quad(lambda x: dN(x), -20, d, limit=50)[0])(d)[()]
+
+
+def N(d, exact=False):
+    ''' Cumulative density function of standard normal random variable x.
+    With exact=True the numerical integration N_quad is used. '''
+    if exact:
+        return N_quad(d)
+    return ndtr(d)
 
 
 def d1f(St, K, t, T, r, sigma):
     ''' Black-Scholes-Merton d1 function.
         Parameters see e.g. BSM_call_value function. '''
-    d1 = (math.log(St / K) + (r + 0.5 * sigma ** 2)
-          * (T - t)) / (sigma * math.sqrt(T - t))
+    d1 = (np.log(St / K) + (r + 0.5 * sigma ** 2)
+          * (T - t)) / (sigma * np.sqrt(T - t))
     return d1
 
 #
@@ -39,7 +50,7 @@ def d1f(St, K, t, T, r, sigma):
 #
 
 
-def BSM_call_value(St, K, t, T, r, sigma):
+def BSM_call_value(St, K, t, T, r, sigma, exact=False):
     ''' Calculates Black-Scholes-Merton European call option value.
 
     Parameters
@@ -56,6 +67,11 @@ def BSM_call_value(St, K, t, T, r, sigma):
         constant, risk-less short rate
     sigma : float
         volatility
+    exact : bool
+        if True, use the numerically integrated N_quad (reference mode)
+
+    All parameters except exact may also be NumPy arrays
+    which are broadcast against each other.
 
     Returns
     =======
@@ -63,12 +79,12 @@ def BSM_call_value(St, K, t, T, r, sigma):
         European call present value at t
     '''
     d1 = d1f(St, K, t, T, r, sigma)
-    d2 = d1 - sigma * math.sqrt(T - t)
-    call_value = St * N(d1) - math.exp(-r * (T - t)) * K * N(d2)
+    d2 = d1 - sigma * np.sqrt(T - t)
+    call_value = St * N(d1, exact) - np.exp(-r * (T - t)) * K * N(d2, exact)
     return call_value
 
 
-def BSM_put_value(St, K, t, T, r, sigma):
+def BSM_put_value(St, K, t, T, r, sigma, exact=False):
     ''' Calculates Black-Scholes-Merton European put option value.
 
     Parameters
@@ -85,17 +101,158 @@ def BSM_put_value(St, K, t, T, r, sigma):
         constant, risk-less short rate
     sigma : float
         volatility
+    exact : bool
+        if True, use the numerically integrated N_quad (reference mode)
+
+    All parameters except exact may also be NumPy arrays
+    which are broadcast against each other.
 
     Returns
     =======
     put_value : float
         European put present value at t
     '''
-    put_value = BSM_call_value(St, K, t, T, r, sigma) \
-        - St + math.exp(-r * (T - t)) * K
+    put_value = BSM_call_value(St, K, t, T, r, sigma, exact) \
+        - St + np.exp(-r * (T - t)) * K
     return put_value
 
 
+def BSM_call_greeks(St, K, t, T, r, sigma):
+    ''' Calculates Black-Scholes-Merton European call option value
+    and Greeks in a single pass.
+
+    Parameters see BSM_call_value function.
+
+    Returns
+    =======
+    greeks : dict
+        'value', 'delta', 'gamma', 'vega', 'theta' and 'rho'
+    '''
+    d1 = d1f(St, K, t, T, r, sigma)
+    d2 = d1 - sigma * np.sqrt(T - t)
+    disc_K = np.exp(-r * (T - t)) * K
+    Nd1 = N(d1)
+    Nd2 = N(d2)
+    dNd1 = dN(d1)
+    greeks = {
+        'value': St * Nd1 - disc_K * Nd2,
+        'delta': Nd1,
+        'gamma': dNd1 / (St * sigma * np.sqrt(T - t)),
+        'vega': St * dNd1 * np.sqrt(T - t),
+        'theta': -St * dNd1 * sigma / (2 * np.sqrt(T - t)) - r * disc_K * Nd2,
+        'rho': (T - t) * disc_K * Nd2
+    }
+    return greeks
+
+
+def BSM_put_greeks(St, K, t, T, r, sigma):
+    ''' Calculates Black-Scholes-Merton European put option value
+    and Greeks in a single pass (via put-call parity).
+
+    Parameters see BSM_put_value function.
+
+    Returns
+    =======
+    greeks : dict
+        'value', 'delta', 'gamma', 'vega', 'theta' and 'rho'
+    '''
+    greeks = BSM_call_greeks(St, K, t, T, r, sigma)
+    disc_K = np.exp(-r * (T - t)) * K
+    greeks['value'] = greeks['value'] - St + disc_K
+    greeks['delta'] = greeks['delta'] - 1
+    greeks['theta'] = greeks['theta'] + r * disc_K
+    greeks['rho'] = greeks['rho'] - (T - t) * disc_K
+    return greeks
+
+
+#
+# Evaluation on Parameter Grids
+#
+
+grid_parameters = ['St', 'K', 't', 'T', 'r', 'sigma']
+
+
+def BSM_grid(function, St, K, t, T, r, sigma, chunk_size=2 ** 20,
+             labelled=False):
+    ''' Evaluates a valuation function on the full grid spanned by
+    the parameter axes in one broadcast.
+
+    Parameters
+    ==========
+    function : callable
+        e.g. BSM_call_value or BSM_call_greeks; called with the broadcast
+        arguments (St, K, t, T, r, sigma) and returning an array
+        or a dict of arrays
+    St, K, t, T, r, sigma : float or 1-d array
+        scalars are held fixed, 1-d arrays span the grid axes
+    chunk_size : int
+        maximum number of grid cells evaluated at once; the grid is
+        split into blocks along its leading axes
+    labelled : bool
+        if True, return an xarray DataArray/Dataset with coordinates
+
+    Returns
+    =======
+    values : ndarray or dict
+        array(s) with one dimension per parameter axis, in the order
+        of grid_parameters
+    '''
+    params = dict(St=St, K=K, t=t, T=T, r=r, sigma=sigma)
+    dims = [p for p in grid_parameters if np.ndim(params[p]) == 1]
+    shape = tuple(len(params[p]) for p in dims)
+    args = {}
+    for p in grid_parameters:
+        value = np.asarray(params[p], dtype=float)
+        if p in dims:
+            axis = dims.index(p)
+            value = value.reshape(
+                [-1 if i == axis else 1 for i in range(len(dims))])
+        args[p] = value
+
+    # blocks of at most chunk_size cells: single indices along the
+    # leading axes and slices along the first axis whose trailing
+    # cells fit into one chunk
+    split = 0
+    while split < len(dims) - 1 and \
+            int(np.prod(shape[split + 1:])) > chunk_size:
+        split += 1
+    if not dims or 0 in shape:
+        blocks = [tuple(slice(None) for _ in dims)]
+    else:
+        step = max(1, chunk_size // int(np.prod(shape[split + 1:])))
+        blocks = [tuple(slice(i, i + 1) for i in index) +
+                  (slice(i, i + step),) +
+                  tuple(slice(None) for _ in shape[split + 1:])
+                  for index in np.ndindex(*shape[:split])
+                  for i in range(0, shape[split], step)]
+
+    values = None
+    for block in blocks:
+        chunk = []
+        for p in grid_parameters:
+            value = args[p]
+            if p in dims:
+                axis = dims.index(p)
+                value = value[(slice(None),) * axis + (block[axis],)]
+            chunk.append(value)
+        result = function(*chunk)
+        if values is None:
+            is_dict = isinstance(result, dict)
+            keys = list(result) if is_dict else [None]
+            values = dict((k, np.empty(shape)) for k in keys)
+        for k in values:
+            v = result[k] if is_dict else result
+            values[k][block] = np.broadcast_to(v, values[k][block].shape)
+
+    if labelled:
+        import xarray as xr
+        coords = dict((p, params[p]) for p in dims)
+        arrays = dict((k, xr.DataArray(v, coords=coords, dims=dims))
+                      for k, v in values.items())
+        return xr.Dataset(arrays) if is_dict else arrays[None]
+    return values if is_dict else values[None]
+
+
 #
 # Plotting European Option Values
 #
@@ -118,7 +275,7 @@ def plot_values(function):
     # C(K) plot
     plt.subplot(221)
     klist = np.linspace(80, 120, points)
-    vlist = [function(St, K, t, T, r, sigma) for K in klist]
+    vlist = BSM_grid(function, St, klist, t, T, r, sigma)
     plt.plot(klist, vlist)
     plt.grid()
     plt.xlabel('strike $K$')
@@ -127,7 +284,7 @@ def plot_values(function):
     # C(T) plot
     plt.subplot(222)
     tlist = np.linspace(0.0001, 1, points)
-    vlist = [function(St, K, t, T, r, sigma) for T in tlist]
+    vlist = BSM_grid(function, St, K, t, tlist, r, sigma)
     plt.plot(tlist, vlist)
     plt.grid(True)
     plt.xlabel('maturity $T$')
@@ -135,8 +292,8 @@ def plot_values(function):
     # C(r) plot
     plt.subplot(223)
     rlist = np.linspace(0, 0.1, points)
-    vlist = [function(St, K, t, T, r, sigma) for r in rlist]
-    plt.plot(tlist, vlist)
+    vlist = BSM_grid(function, St, K, t, T, rlist, sigma)
+    plt.plot(rlist, vlist)
     plt.grid(True)
     plt.xlabel('short rate $r$')
     plt.ylabel('present value')
@@ -145,7 +302,7 @@ def plot_values(function):
     # C(sigma) plot
     plt.subplot(224)
     slist = np.linspace(0.01, 0.5, points)
-    vlist = [function(St, K, t, T, r, sigma) for sigma in slist]
+    vlist = BSM_grid(function, St, K, t, T, r, slist)
     plt.plot(slist, vlist)
     plt.grid(True)
     plt.xlabel('volatility $\sigma$')
@@ -9,9 +9,11 @@
 # (c) Dr. Yves J. Hilpisch
 # Derivatives Analytics with Python
 #
+import os
 import numpy as np
 import pandas as pd
-from BSM_implied_vol import call_option
+from BSM_implied_vol import OptionChain
+from option_quote_store import OptionQuoteStore
 import matplotlib as mpl
 import matplotlib.pyplot as plt
 mpl.rcParams['font.family'] = 'serif'
@@ -25,46 +27,118 @@ pdate = pd.Timestamp('30-09-2014')
 
 # URL of data file
 es_url = 'http://www.stoxx.com/download/historical_values/hbrbcpe.txt'
+# local cache of the parsed index data
+es_cache = 'es50_index_data.pkl'
 # column names to be used
 cols = ['Date', 'SX5P', 'SX5E', 'SXXP', 'SXXE',
         'SXXF', 'SXXA', 'DK5F', 'DKXF', 'DEL']
-# reading the data with pandas
-es = pd.read_csv(es_url,  # filename
-                 header=None,  # ignore column names
-                 index_col=0,  # index column (dates)
-                 parse_dates=True,  # parse these dates
-                 dayfirst=True,  # format of dates
-                 skiprows=4,  # ignore these rows
-                 sep=';',  # data separator
-                 names=cols)  # use these column names
-# deleting the helper column
-del es['DEL']
-S0 = es['SX5E']['30-09-2014']
 r = -0.05
 
+
+def load_index_data():
+    ''' Returns the index data, downloading it only if no local
+    cache exists. '''
+    if os.path.exists(es_cache):
+        return pd.read_pickle(es_cache)
+    # reading the data with pandas
+    es = pd.read_csv(es_url,  # filename
+                     header=None,  # ignore column names
+                     index_col=0,  # index column (dates)
+                     parse_dates=True,  # parse these dates
+                     dayfirst=True,  # format of dates
+                     skiprows=4,  # ignore these rows
+                     sep=';',  # data separator
+                     names=cols)  # use these column names
+    # deleting the helper column
+    del es['DEL']
+    es.to_pickle(es_cache)
+    return es
+
+
 #
 # Option Data
 #
-data = pd.HDFStore('../dawp/python36/03_stf/es50_option_data.h5', 'r')['data']
+h5_path = '../dawp/python36/03_stf/es50_option_data.h5'
+store_path = 'es50_option_store'
+
+
+def get_option_data(date=None, maturity=None):
+    ''' Returns the option quotes for a pricing date and/or maturity
+    (all quotes if None) from the local quote store. The store is built
+    from the HDF5 file on first use. '''
+    store = OptionQuoteStore(store_path)
+    if not store.exists():
+        with pd.HDFStore(h5_path, 'r') as h5:
+            store = OptionQuoteStore.write(store_path, h5['data'])
+    return store.load(date, maturity)
+
+
+# module attributes loaded on first access (no I/O at import time)
+_lazy_attributes = {
+    'es': load_index_data,
+    'S0': lambda: __getattr__('es')['SX5E'][pdate],
+    'data': get_option_data,
+}
+
+
+def __getattr__(name):
+    ''' Loads es, S0 and data lazily on first access. '''
+    if name not in _lazy_attributes:
+        raise AttributeError("module %r has no attribute %r"
+                             % (__name__, name))
+    if name not in globals():
+        globals()[name] = _lazy_attributes[name]()
+    return globals()[name]
+
 
 #
 # BSM Implied Volatilities
 #
 
 
-def calculate_imp_vols(data):
+def calculate_imp_vols(data, previous=None, S0=None, r=None, tol=0.30):
     ''' Calculate all implied volatilities for the European call options
-    given the tolerance level for moneyness of the option.'''
-    data['Imp_Vol'] = 0.0
-    tol = 0.30  # tolerance for moneyness
-    for row in data.index:
-        t = data['Date'][row]
-        T = data['Maturity'][row]
-        ttm = (T - t).days / 365.
-        forward = np.exp(r * ttm) * S0
-        if (abs(data['Strike'][row] - forward) / forward) < tol:
-            call = call_option(S0, data['Strike'][row], t, T, r, 0.2)
-            data.loc[row, 'Imp_Vol'] = call.imp_vol(data.loc[row, 'Call'])
+    given the tolerance level for moneyness of the option.
+
+    Eligible quotes are selected with array masks and inverted in one
+    batch via OptionChain. The call prices the volatilities were implied
+    from are kept in the column _Call_priced; if the result of an earlier
+    call is passed as previous (and the underlying level and short rate
+    are unchanged), only quotes whose price changed since are
+    recomputed, even if previous is the same (meanwhile updated) frame
+    as data.'''
+    if S0 is None:
+        S0 = __getattr__('S0')
+    if r is None:
+        r = globals()['r']
+    t = data['Date'].values
+    T = data['Maturity'].values
+    strike = data['Strike'].values.astype(float)
+    call = data['Call'].values.astype(float)
+    ttm = ((T - t) // np.timedelta64(1, 'D')) / 365.
+    forward = np.exp(r * ttm) * S0
+    todo = (np.abs(strike - forward) / forward) < tol
+    imp_vol = np.zeros(len(data))
+
+    if (previous is not None and previous.attrs.get('S0') == S0
+            and previous.attrs.get('r') == r
+            and '_Call_priced' in previous.columns):
+        # compare with the prices the earlier volatilities were implied
+        # from, not with previous['Call'] (which may have been updated)
+        keys = ['Date', 'Maturity', 'Strike']
+        prev = previous.set_index(keys)[['_Call_priced', 'Imp_Vol']].reindex(
+            pd.MultiIndex.from_arrays([data[k] for k in keys]))
+        unchanged = todo & (prev['_Call_priced'].values == call)
+        imp_vol[unchanged] = prev['Imp_Vol'].values[unchanged]
+        todo &= ~unchanged
+
+    if todo.any():
+        chain = OptionChain(S0, strike[todo], t[todo], T[todo], r, 0.2)
+        imp_vol[todo] = chain.imp_vol(call[todo])
+    data['Imp_Vol'] = imp_vol
+    data['_Call_priced'] = call
+    data.attrs['S0'] = S0
+    data.attrs['r'] = r
     return data
 
 
@@ -6,9 +6,12 @@
 # Derivatives Analytics with Python
 #
 import math
+import numbers
+import json
 import numpy as np
 import pandas as pd
 import scipy.stats as scs
+from scipy.special import ndtri
 import statsmodels.api as sm
 import matplotlib as mpl
 import matplotlib.pyplot as plt
@@ -44,30 +47,196 @@ def dN(x, mu, sigma):
 #
 
 
-def simulate_gbm():
-    # model parameters
-    S0 = 100.0  # initial index level
-    T = 10.0  # time horizon
-    r = 0.05  # risk-less short rate
-    vol = 0.2  # instantaneous volatility
-
-    # simulation parameters
-    np.random.seed(250000)
-    gbm_dates = pd.DatetimeIndex(start='30-09-2004',
-                                 end='30-09-2014',
-                                 freq='B')
-    M = len(gbm_dates)  # time steps
-    I = 1  # index level paths
-    dt = 1 / 252.  # fixed for simplicity
-    df = math.exp(-r * dt)  # discount factor
-
-    # stock price paths
-    rand = np.random.standard_normal((M, I))  # random numbers
-    S = np.zeros_like(rand)  # stock matrix
-    S[0] = S0  # initial values
-    for t in range(1, M):  # stock price paths
-        S[t] = S[t - 1] * np.exp((r - vol ** 2 / 2) * dt +
-                                 vol * rand[t] * math.sqrt(dt))
+def random_state(seed=None):
+    ''' Returns a random number generator for seed; generators
+    (objects with a standard_normal method) are passed through. '''
+    if hasattr(seed, 'standard_normal'):
+        return seed
+    return np.random.RandomState(seed)
+
+
+def _standard_normal(rng, shape, dtype):
+    ''' Draws standard normal random numbers of the given dtype. '''
+    if isinstance(rng, np.random.Generator):
+        return rng.standard_normal(shape, dtype=dtype)
+    return rng.standard_normal(shape).astype(dtype, copy=False)
+
+
+def gbm_paths(S0, r, vol, dates, paths=1, seed=None, dt=1 / 252.,
+              dtype=np.float64, filename=None, block_steps=256):
+    ''' Simulates paths of a geometric Brownian motion in one go.
+
+    Parameters
+    ==========
+    S0 : float
+        initial index level
+    r : float
+        risk-less short rate
+    vol : float
+        instantaneous volatility
+    dates : DatetimeIndex or int
+        dates of the time grid (or number of time steps M)
+    paths : int
+        number of paths I
+    seed : int or generator
+        seed or random number generator
+    dt : float
+        length of a time step (fixed for simplicity)
+    dtype : dtype
+        floating point type of the returned paths
+    filename : str
+        if given, the paths are written block by block to a memory-mapped
+        path file (see open_gbm_paths) instead of being held in memory
+    block_steps : int
+        number of time steps per block when writing to filename
+
+    Returns
+    =======
+    S : ndarray or memmap
+        index levels of shape (M, I), S[0] = S0
+    dates : DatetimeIndex or None
+        dates of the time grid
+    '''
+    if isinstance(dates, numbers.Integral):
+        M, dates = int(dates), None
+    else:
+        dates = pd.DatetimeIndex(dates)
+        M = len(dates)
+    rng = random_state(seed)
+    if filename is not None:
+        meta = {'S0': S0, 'r': r, 'vol': vol, 'dt': dt,
+                'seed': int(seed) if isinstance(seed, numbers.Integral)
+                else None,
+                'dates': None if dates is None
+                else [str(d) for d in dates]}
+        S = _create_path_file(filename, (M, paths), dtype, meta)
+        last = np.zeros(paths, dtype=dtype)
+        for start in range(0, M, block_steps):
+            block = _standard_normal(rng, (min(block_steps, M - start),
+                                           paths), dtype)
+            block *= vol * math.sqrt(dt)
+            block += (r - vol ** 2 / 2) * dt
+            if start == 0:
+                block[0] = 0.0
+            block[0] += last
+            np.cumsum(block, axis=0, out=block)
+            last = block[-1].copy()
+            np.exp(block, out=block)
+            block *= S0
+            S[start:start + len(block)] = block
+        S.flush()
+        return S, dates
+
+    S = _standard_normal(rng, (M, paths), dtype)
+    return gbm_from_normals(S0, r, vol, S, dt), dates
+
+
+def gbm_from_normals(S0, r, vol, z, dt=1 / 252.):
+    ''' Turns standard normal random numbers into GBM paths in place.
+
+    Parameters
+    ==========
+    S0 : float
+        initial index level
+    r : float
+        risk-less short rate
+    vol : float
+        instantaneous volatility
+    z : ndarray
+        standard normals of shape (M, I); row 0 is ignored
+    dt : float
+        length of a time step
+
+    Returns
+    =======
+    S : ndarray
+        index levels of shape (M, I), S[0] = S0 (the array z itself)
+    '''
+    # log increments, accumulated and exponentiated in place
+    z *= vol * math.sqrt(dt)
+    z += (r - vol ** 2 / 2) * dt
+    z[0] = 0.0
+    np.cumsum(z, axis=0, out=z)
+    np.exp(z, out=z)
+    z *= S0
+    return z
+
+#
+# Memory-Mapped Path Files
+#
+
+# a path file starts with the magic string, the header length
+# (8 bytes, little endian) and a JSON header; the path matrix
+# follows at an offset aligned to 64 bytes
+_path_file_magic = b'GBMPATHS'
+
+
+def _create_path_file(filename, shape, dtype, meta):
+    ''' Writes the header of a path file and returns a writable memmap
+    onto its (uninitialized) path matrix. '''
+    meta = dict(meta, shape=list(shape), dtype=np.dtype(dtype).str)
+    header = json.dumps(meta).encode('utf-8')
+    offset = len(_path_file_magic) + 8 + len(header)
+    offset += -offset % 64
+    header += b' ' * (offset - len(_path_file_magic) - 8 - len(header))
+    with open(filename, 'wb') as f:
+        f.write(_path_file_magic)
+        f.write(len(header).to_bytes(8, 'little'))
+        f.write(header)
+    return np.memmap(filename, dtype=dtype, mode='r+', offset=offset,
+                     shape=tuple(shape))
+
+
+def open_gbm_paths(filename, mode='r'):
+    ''' Opens a path file written by gbm_paths(..., filename=...)
+    without copying the paths.
+
+    Returns
+    =======
+    S : memmap
+        index levels of shape (M, I); slicing rows (time steps)
+        reads only the corresponding bytes
+    meta : dict
+        simulation parameters (S0, r, vol, dt, seed) and dates
+    '''
+    with open(filename, 'rb') as f:
+        if f.read(len(_path_file_magic)) != _path_file_magic:
+            raise ValueError("%s is not a GBM path file." % filename)
+        length = int.from_bytes(f.read(8), 'little')
+        meta = json.loads(f.read(length).decode('utf-8'))
+    offset = len(_path_file_magic) + 8 + length
+    S = np.memmap(filename, dtype=np.dtype(meta['dtype']), mode=mode,
+                  offset=offset, shape=tuple(meta['shape']))
+    if meta['dates'] is not None:
+        meta['dates'] = pd.DatetimeIndex(meta['dates'])
+    return S, meta
+
+
+def simulate_gbm(S0=100.0, r=0.05, vol=0.2, start='30-09-2004',
+                 end='30-09-2014', seed=250000):
+    ''' Simulates a single path of daily index levels and returns it
+    with log returns and realized volatility as a DataFrame.
+
+    Parameters
+    ==========
+    S0 : float
+        initial index level
+    r : float
+        risk-less short rate
+    vol : float
+        instantaneous volatility
+    start, end : str
+        first and last date of the business day grid
+    seed : int or generator
+        seed or random number generator
+
+    Returns
+    =======
+    gbm : DataFrame
+        columns index, returns, rea_var and rea_vol
+    '''
+    gbm_dates = pd.date_range(start=start, end=end, freq='B')
+    S, gbm_dates = gbm_paths(S0, r, vol, gbm_dates, 1, seed)
 
     gbm = pd.DataFrame(S[:, 0], index=gbm_dates, columns=['index'])
     gbm['returns'] = np.log(gbm['index'] / gbm['index'].shift(1))
@@ -78,31 +247,273 @@ def simulate_gbm():
     gbm = gbm.dropna()
     return gbm
 
+#
+# Quasi-Monte Carlo Paths (Sobol Sequences, Brownian Bridge)
+#
+
+
+def brownian_bridge(z, dt):
+    ''' Builds Brownian motion increments from standard normals z of
+    shape (steps, n) in Brownian-bridge order: z[0] fixes the terminal
+    value, the following rows fill in midpoints of ever finer intervals,
+    so the leading (best distributed) dimensions carry most variance.
+
+    Returns
+    =======
+    dW : ndarray
+        Brownian increments of shape (steps, n)
+    '''
+    steps = z.shape[0]
+    W = np.zeros((steps + 1,) + z.shape[1:])
+    W[steps] = math.sqrt(steps * dt) * z[0]
+    intervals = [(0, steps)]
+    k = 1
+    while intervals:
+        left, right = intervals.pop(0)
+        if right - left < 2:
+            continue
+        mid = (left + right) // 2
+        a, b = mid - left, right - mid
+        W[mid] = ((b * W[left] + a * W[right]) / (a + b)
+                  + math.sqrt(a * b / (a + b) * dt) * z[k])
+        k += 1
+        intervals.extend([(left, mid), (mid, right)])
+    return np.diff(W, axis=0)
+
+
+def sobol_normals(steps, paths, seed=None):
+    ''' Returns standard normals of shape (steps, paths) from a scrambled
+    Sobol sequence (one dimension per time step); paths should be a
+    power of 2. '''
+    sobol = scs.qmc.Sobol(d=steps, scramble=True, seed=seed)
+    u = sobol.random(paths)
+    return ndtri(np.clip(u, 1e-16, 1 - 1e-16)).T
+
+
+def qmc_gbm_paths(S0, r, vol, steps, paths, seed=None, dt=1 / 252.):
+    ''' Simulates GBM paths of shape (steps + 1, paths) from scrambled
+    Sobol points with Brownian-bridge construction. '''
+    dW = brownian_bridge(sobol_normals(steps, paths, seed), dt)
+    S = np.zeros((steps + 1, paths))
+    S[1:] = (r - vol ** 2 / 2) * dt + vol * dW
+    np.cumsum(S, axis=0, out=S)
+    return S0 * np.exp(S)
+
+
+def qmc_value(payoff, S0, r, vol, steps, paths, dt=1 / 252.,
+              replications=16, seed=None):
+    ''' Randomized QMC estimate of E[payoff(S)] from independently
+    scrambled Sobol replications.
+
+    Returns
+    =======
+    value : float
+        mean over the replications
+    std_error : float
+        standard error across the replications
+    '''
+    seeds = np.random.SeedSequence(seed).spawn(replications)
+    estimates = np.array([payoff(qmc_gbm_paths(S0, r, vol, steps, paths,
+                                               np.random.default_rng(sq),
+                                               dt)).mean()
+                          for sq in seeds])
+    return estimates.mean(), estimates.std(ddof=1) / math.sqrt(replications)
+
+
+def qmc_convergence(S0=100., K=105., T=1., r=0.05, vol=0.2, steps=64,
+                    sizes=(2 ** 8, 2 ** 10, 2 ** 12, 2 ** 14),
+                    replications=16, seed=None):
+    ''' Benchmarks randomized QMC against pseudo-random paths for a
+    European call (error vs. analytic BSM value by number of paths).
+
+    Returns
+    =======
+    results : DataFrame
+        RMSE and standard errors per number of paths per replication
+    '''
+    from BSM_option_valuation import BSM_call_value
+    exact = BSM_call_value(S0, K, 0, T, r, vol)
+    dt = T / steps
+    df = math.exp(-r * T)
+
+    def payoff(S):
+        return df * np.maximum(S[-1] - K, 0)
+
+    rng = np.random.default_rng(seed)
+    rows = []
+    for n in sizes:
+        mc = np.array([payoff(gbm_paths(S0, r, vol, steps + 1, n, rng,
+                                        dt)[0]).mean()
+                       for _ in range(replications)])
+        qmc = np.array([payoff(qmc_gbm_paths(S0, r, vol, steps, n, rng,
+                                             dt)).mean()
+                        for _ in range(replications)])
+        rows.append({'paths': n,
+                     'mc_rmse': np.sqrt(np.mean((mc - exact) ** 2)),
+                     'qmc_rmse': np.sqrt(np.mean((qmc - exact) ** 2)),
+                     'mc_std': mc.std(ddof=1), 'qmc_std': qmc.std(ddof=1)})
+    results = pd.DataFrame(rows).set_index('paths')
+    results['ratio'] = results['mc_rmse'] / results['qmc_rmse']
+    return results
+
 # Return Sample Statistics and Normality Tests
 
 
+class ReturnStatistics(object):
+    ''' Single-pass, mergeable accumulator of return statistics.
+
+    Keeps count, mean and the central moment sums M2, M3, M4 (combined
+    with Welford-style pairwise updates, Pebay 2008) plus the sum of
+    squared returns for the realized variance. Chunks of returns, single
+    ticks or accumulators of other chunks/processes can be added in any
+    grouping without materializing the series.
+
+    Methods
+    =======
+    update:
+        adds a chunk (or a single value) of returns
+    merge:
+        adds the returns summarized by another accumulator
+    skewtest, kurtosistest, normaltest:
+        p-values of the D'Agostino normality tests (as scipy.stats)
+    '''
+
+    def __init__(self, periods=252):
+        self.periods = periods
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.m3 = 0.0
+        self.m4 = 0.0
+        self.sum_sq = 0.0
+
+    def _combine(self, n, mean, m2, m3, m4, sum_sq):
+        na, nb = self.n, n
+        total = na + nb
+        if nb == 0:
+            return
+        delta = mean - self.mean
+        self.m4 += (m4 + delta ** 4 * na * nb * (na ** 2 - na * nb + nb ** 2)
+                    / total ** 3
+                    + 6 * delta ** 2 * (na ** 2 * m2 + nb ** 2 * self.m2)
+                    / total ** 2
+                    + 4 * delta * (na * m3 - nb * self.m3) / total)
+        self.m3 += (m3 + delta ** 3 * na * nb * (na - nb) / total ** 2
+                    + 3 * delta * (na * m2 - nb * self.m2) / total)
+        self.m2 += m2 + delta ** 2 * na * nb / total
+        self.mean += delta * nb / total
+        self.sum_sq += sum_sq
+        self.n = total
+
+    def update(self, returns):
+        ''' Adds a chunk (or a single value) of returns. '''
+        x = np.asarray(returns, dtype=float).ravel()
+        x = x[~np.isnan(x)]
+        if x.size == 0:
+            return
+        mean = x.mean()
+        d = x - mean
+        d2 = d * d
+        self._combine(x.size, mean, d2.sum(), (d2 * d).sum(),
+                      (d2 * d2).sum(), (x * x).sum())
+
+    def merge(self, other):
+        ''' Adds the returns summarized by another accumulator. '''
+        self._combine(other.n, other.mean, other.m2, other.m3, other.m4,
+                      other.sum_sq)
+
+    @property
+    def std(self):
+        ''' Standard deviation (ddof=0, as np.std). '''
+        return math.sqrt(self.m2 / self.n)
+
+    @property
+    def skew(self):
+        ''' Sample skewness (as scs.skew). '''
+        return math.sqrt(self.n) * self.m3 / self.m2 ** 1.5
+
+    @property
+    def kurtosis(self):
+        ''' Sample excess kurtosis (as scs.kurtosis). '''
+        return self.n * self.m4 / self.m2 ** 2 - 3
+
+    @property
+    def realized_variance(self):
+        return self.periods * self.sum_sq / self.n
+
+    @property
+    def realized_volatility(self):
+        return math.sqrt(self.realized_variance)
+
+    def _skew_z(self):
+        n = self.n
+        y = self.skew * math.sqrt(((n + 1) * (n + 3)) / (6.0 * (n - 2)))
+        beta2 = (3.0 * (n ** 2 + 27 * n - 70) * (n + 1) * (n + 3)
+                 / ((n - 2.0) * (n + 5) * (n + 7) * (n + 9)))
+        W2 = -1 + math.sqrt(2 * (beta2 - 1))
+        delta = 1 / math.sqrt(0.5 * math.log(W2))
+        alpha = math.sqrt(2.0 / (W2 - 1))
+        y = 1 if y == 0 else y
+        return delta * math.log(y / alpha + math.sqrt((y / alpha) ** 2 + 1))
+
+    def _kurtosis_z(self):
+        n = self.n
+        b2 = self.kurtosis + 3
+        E = 3.0 * (n - 1) / (n + 1)
+        varb2 = (24.0 * n * (n - 2) * (n - 3)
+                 / ((n + 1) * (n + 1.) * (n + 3) * (n + 5)))
+        x = (b2 - E) / math.sqrt(varb2)
+        sqrtbeta1 = (6.0 * (n * n - 5 * n + 2) / ((n + 7) * (n + 9))
+                     * math.sqrt((6.0 * (n + 3) * (n + 5))
+                                 / (n * (n - 2) * (n - 3))))
+        A = 6.0 + 8.0 / sqrtbeta1 * (2.0 / sqrtbeta1
+                                     + math.sqrt(1 + 4.0 / sqrtbeta1 ** 2))
+        term1 = 1 - 2 / (9.0 * A)
+        denom = 1 + x * math.sqrt(2 / (A - 4.0))
+        if denom == 0:
+            return np.nan
+        term2 = np.sign(denom) * ((1 - 2.0 / A) / abs(denom)) ** (1 / 3.0)
+        return (term1 - term2) / math.sqrt(2 / (9.0 * A))
+
+    def skewtest(self):
+        ''' p-value of the skewness normality test. '''
+        return 2 * scs.norm.sf(abs(self._skew_z()))
+
+    def kurtosistest(self):
+        ''' p-value of the kurtosis normality test. '''
+        return 2 * scs.norm.sf(abs(self._kurtosis_z()))
+
+    def normaltest(self):
+        ''' p-value of the omnibus normality test. '''
+        k2 = self._skew_z() ** 2 + self._kurtosis_z() ** 2
+        return scs.chi2.sf(k2, 2)
+
+
 def print_statistics(data):
+    ''' Prints return statistics and normality tests for a DataFrame
+    with a returns column or a ReturnStatistics accumulator. '''
+    if isinstance(data, ReturnStatistics):
+        stats = data
+    else:
+        stats = ReturnStatistics()
+        stats.update(data['returns'].values)
     print("RETURN SAMPLE STATISTICS")
     print("---------------------------------------------")
-    print("Mean of Daily  Log Returns %9.6f" % np.mean(data['returns']))
-    print("Mean of Annua. Log Returns %9.6f" %
-          (np.mean(data['returns']) * 252))
+    print("Mean of Daily  Log Returns %9.6f" % stats.mean)
+    print("Mean of Annua. Log Returns %9.6f" % (stats.mean * 252))
     print("Std  of Annua. Log Returns %9.6f" %
-          (np.std(data['returns']) * math.sqrt(252)))
+          (stats.std * math.sqrt(252)))
     print("---------------------------------------------")
-    print("Skew of Sample Log Returns %9.6f" % scs.skew(data['returns']))
-    print("Skew Normal Test p-value   %9.6f" %
-          scs.skewtest(data['returns'])[1])
+    print("Skew of Sample Log Returns %9.6f" % stats.skew)
+    print("Skew Normal Test p-value   %9.6f" % stats.skewtest())
     print("---------------------------------------------")
-    print("Kurt of Sample Log Returns %9.6f" % scs.kurtosis(data['returns']))
-    print("Kurt Normal Test p-value   %9.6f" %
-          scs.kurtosistest(data['returns'])[1])
+    print("Kurt of Sample Log Returns %9.6f" % stats.kurtosis)
+    print("Kurt Normal Test p-value   %9.6f" % stats.kurtosistest())
     print("---------------------------------------------")
-    print("Normal Test p-value        %9.6f" %
-          scs.normaltest(data['returns'])[1])
+    print("Normal Test p-value        %9.6f" % stats.normaltest())
     print("---------------------------------------------")
-    print("Realized Volatility        %9.6f" % data['rea_vol'].iloc[-1])
-    print("Realized Variance          %9.6f" % data['rea_var'].iloc[-1])
+    print("Realized Volatility        %9.6f" % stats.realized_volatility)
+    print("Realized Variance          %9.6f" % stats.realized_variance)
 
 #
 # Graphical Output
@@ -163,30 +574,117 @@ def realized_volatility(data):
 # mean return, volatility and correlation (252 days moving = 1 year)
 
 
-def rolling_statistics(data):
-    ''' Calculates and plots rolling statistics (mean, std, correlation). '''
+def _window_sums(x, window):
+    ''' Rolling sums over window rows from prefix sums (NaN for the
+    first window - 1 rows). '''
+    c = np.zeros((x.shape[0] + 1,) + x.shape[1:])
+    np.cumsum(x, axis=0, out=c[1:])
+    sums = np.full(x.shape, np.nan)
+    sums[window - 1:] = c[window:] - c[:-window]
+    return sums
+
+
+def _rolling_corr(x, y, window):
+    ''' Rolling correlation of x and y (valid after their leading NaN
+    rows plus window - 1 rows). '''
+    first = int(np.argmax(~np.isnan(x[:, 0]))) if np.isnan(x).any() else 0
+    corr = np.full(x.shape, np.nan)
+    xv, yv = x[first:], y[first:]
+    if len(xv) < window:
+        return corr
+    # centering keeps the prefix sums well conditioned
+    xv = xv - xv.mean(axis=0)
+    yv = yv - yv.mean(axis=0)
+    sx, sy = _window_sums(xv, window), _window_sums(yv, window)
+    sxx = _window_sums(xv * xv, window)
+    syy = _window_sums(yv * yv, window)
+    sxy = _window_sums(xv * yv, window)
+    cov = sxy - sx * sy / window
+    with np.errstate(invalid='ignore', divide='ignore'):
+        corr[first:] = cov / np.sqrt((sxx - sx ** 2 / window)
+                                     * (syy - sy ** 2 / window))
+    return corr
+
+
+def rolling_stats(returns, windows=(252,), periods=252):
+    ''' Rolling annualized mean, volatility and mean/volatility
+    correlation for many return series and window lengths.
+
+    All statistics come from shared prefix sums, so every series and
+    window costs O(N) independent of the window length.
+
+    Parameters
+    ==========
+    returns : array
+        returns of shape (N,) or (N, series) without missing values
+    windows : list of int
+        window lengths
+    periods : int
+        periods per year for annualization
+
+    Returns
+    =======
+    stats : dict
+        for every window a dict with arrays 'mean', 'vol' (ddof=1) and
+        'corr' of the shape of returns; NaN where a window is incomplete
+    '''
+    x = np.asarray(returns, dtype=float)
+    one_d = x.ndim == 1
+    if one_d:
+        x = x[:, None]
+    xc = x - x.mean(axis=0)
+    c1 = np.zeros((x.shape[0] + 1, x.shape[1]))
+    c2 = np.zeros_like(c1)
+    np.cumsum(xc, axis=0, out=c1[1:])
+    np.cumsum(xc * xc, axis=0, out=c2[1:])
+    stats = {}
+    for w in windows:
+        s1 = np.full(x.shape, np.nan)
+        s2 = np.full(x.shape, np.nan)
+        s1[w - 1:] = c1[w:] - c1[:-w]
+        s2[w - 1:] = c2[w:] - c2[:-w]
+        mean = (s1 / w + x.mean(axis=0)) * periods
+        var = np.maximum(s2 - s1 ** 2 / w, 0) / (w - 1)
+        vol = np.sqrt(var * periods)
+        corr = _rolling_corr(mean, vol, w)
+        stats[w] = dict((k, v[:, 0] if one_d else v) for k, v in
+                        [('mean', mean), ('vol', vol), ('corr', corr)])
+    return stats
+
+
+def rolling_statistics(data, window=252, plot=True):
+    ''' Calculates and plots rolling statistics (mean, std, correlation).
+
+    Returns
+    =======
+    stats : DataFrame
+        columns mean, vol and corr (annualized, window days moving)
+    '''
+    st = rolling_stats(data['returns'].values, [window])[window]
+    stats = pd.DataFrame(st, index=data.index)
+    if not plot:
+        return stats
+    mr, vo, co = stats['mean'], stats['vol'], stats['corr']
     plt.figure(figsize=(11, 8))
 
     plt.subplot(311)
-    mr = data['returns'].rolling(252).mean() * 252
     mr.plot()
     plt.grid(True)
-    plt.ylabel('returns (252d)')
+    plt.ylabel('returns (%dd)' % window)
     plt.axhline(mr.mean(), color='r', ls='dashed', lw=1.5)
 
     plt.subplot(312)
-    vo = data['returns'].rolling(252).std() * math.sqrt(252)
     vo.plot()
     plt.grid(True)
-    plt.ylabel('volatility (252d)')
+    plt.ylabel('volatility (%dd)' % window)
     plt.axhline(vo.mean(), color='r', ls='dashed', lw=1.5)
     vx = plt.axis()
 
     plt.subplot(313)
-    co = mr.rolling(252).corr(vo)
     co.plot()
     plt.grid(True)
-    plt.ylabel('correlation (252d)')
+    plt.ylabel('correlation (%dd)' % window)
     cx = plt.axis()
     plt.axis([vx[0], vx[1], cx[2], cx[3]])
-    plt.axhline(co.mean(), color='r', ls='dashed', lw=1.5)
\ No newline at end of file
+    plt.axhline(co.mean(), color='r', ls='dashed', lw=1.5)
+    return stats
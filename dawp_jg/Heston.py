@@ -0,0 +1,108 @@
+#
+# Simulation of Heston (1993) Stochastic Volatility Paths
+# (Euler Scheme with Full Truncation)
+# dawp_jg/Heston.py
+#
+# Same interface, random number handling and chunking
+# as the GBM path generator in GBM.py / MC_engine.py
+#
+import math
+import numbers
+import functools
+import numpy as np
+import pandas as pd
+from GBM import random_state, _standard_normal
+
+
+def heston_paths(S0, v0, kappa, theta, xi, rho, r, dates, paths=1,
+                 seed=None, dt=1 / 252., dtype=np.float64):
+    ''' Simulates correlated index level and variance paths of the
+    Heston model, vectorized over all paths.
+
+    The variance follows the Euler scheme with full truncation
+    (v+ = max(v, 0) in drift and diffusion); the log index level uses
+    the truncated variance and is accumulated with one cumsum.
+
+    Parameters
+    ==========
+    S0 : float
+        initial index level
+    v0 : float
+        initial variance
+    kappa : float
+        speed of mean reversion of the variance
+    theta : float
+        long-term variance
+    xi : float
+        volatility of variance
+    rho : float
+        correlation between index level and variance shocks
+    r : float
+        risk-less short rate
+    dates : DatetimeIndex or int
+        dates of the time grid (or number of time steps M)
+    paths : int
+        number of paths I
+    seed : int or generator
+        seed or random number generator
+    dt : float
+        length of a time step
+    dtype : dtype
+        floating point type of the returned paths
+
+    Returns
+    =======
+    S : ndarray
+        index levels of shape (M, I), S[0] = S0
+    v : ndarray
+        (truncated) variances of shape (M, I), v[0] = v0
+    dates : DatetimeIndex or None
+        dates of the time grid
+    '''
+    if isinstance(dates, numbers.Integral):
+        M, dates = int(dates), None
+    else:
+        dates = pd.DatetimeIndex(dates)
+        M = len(dates)
+    rng = random_state(seed)
+    z = _standard_normal(rng, (2, M, paths), dtype)
+    z_v = z[0]
+    # correlated shocks of the index level, computed in place
+    z_s = z[1]
+    z_s *= math.sqrt(1 - rho ** 2)
+    z_s += rho * z_v
+
+    v = np.empty((M, paths), dtype=dtype)
+    v[0] = v0
+    v_raw = np.full(paths, v0, dtype=float)
+    sdt = math.sqrt(dt)
+    for t in range(1, M):
+        v_pos = np.maximum(v_raw, 0)
+        v_raw += (kappa * (theta - v_pos) * dt
+                  + xi * np.sqrt(v_pos) * sdt * z_v[t])
+        v[t] = np.maximum(v_raw, 0)
+
+    # log increments of the index level use the variance of the previous step
+    S = z_s
+    S[1:] *= np.sqrt(v[:-1]) * sdt
+    S[1:] += (r - v[:-1] / 2) * dt
+    S[0] = 0.0
+    np.cumsum(S, axis=0, out=S)
+    np.exp(S, out=S)
+    S *= S0
+    return S, v, dates
+
+
+def _heston_chunk(S0, v0, kappa, theta, xi, rho, r, steps, dt, dtype,
+                  paths, rng):
+    return heston_paths(S0, v0, kappa, theta, xi, rho, r, steps + 1, paths,
+                        rng, dt, dtype)[0]
+
+
+def heston_generator(S0, v0, kappa, theta, xi, rho, r, steps, dt=1 / 252.,
+                     dtype=np.float64):
+    ''' Returns a (picklable) path generator function(paths, rng) for
+    MC_engine.stream_mc/parallel_mc producing Heston index level paths
+    of shape (steps + 1, paths). '''
+    return functools.partial(_heston_chunk, S0, v0, kappa, theta, xi, rho,
+                             r, steps, dt, dtype)
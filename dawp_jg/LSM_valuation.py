@@ -0,0 +1,101 @@
+#
+# Valuation of American Options by Least-Squares Monte Carlo
+# (Longstaff-Schwartz Algorithm) on Simulated Paths
+# dawp_jg/LSM_valuation.py
+#
+import math
+import numpy as np
+from GBM import gbm_paths
+
+
+def exercise_value(S, K, option='put'):
+    ''' Inner value of a call or put for index levels S. '''
+    if option == 'put':
+        return np.maximum(K - S, 0)
+    return np.maximum(S - K, 0)
+
+
+def _basis(x, degree):
+    ''' Polynomial regression basis 1, x, ..., x ** degree. '''
+    return np.vander(x, degree + 1, increasing=True)
+
+
+def lsm_value(S, K, r, dt, option='put', degree=3, chunk_size=None):
+    ''' Values an American option on simulated paths with the
+    Longstaff-Schwartz algorithm.
+
+    The backward induction keeps one discounted cash flow per path.
+    At every time step the continuation values of all in-the-money
+    paths are estimated with one least-squares regression. Its normal
+    equations are accumulated over chunks of paths, so only a
+    (chunk_size, degree + 1) design matrix is alive at any time.
+
+    Parameters
+    ==========
+    S : array
+        index level paths of shape (M + 1, I), e.g. from gbm_paths or a
+        memory-mapped path file (open_gbm_paths)
+    K : float
+        strike price
+    r : float
+        risk-less short rate
+    dt : float
+        length of a time step (in year fractions)
+    option : str
+        'put' or 'call'
+    degree : int
+        degree of the regression polynomial (in S / K)
+    chunk_size : int
+        number of paths per regression chunk (default: all paths)
+
+    Returns
+    =======
+    value : float
+        present value of the American option (at least the inner
+        value at t = 0)
+    std_error : float
+        standard error of the estimate (0 if immediate exercise is
+        optimal)
+    '''
+    steps, paths = S.shape[0] - 1, S.shape[1]
+    if chunk_size is None:
+        chunk_size = paths
+    chunks = [slice(i, min(i + chunk_size, paths))
+              for i in range(0, paths, chunk_size)]
+    df = math.exp(-r * dt)
+    V = exercise_value(np.asarray(S[-1], dtype=float), K, option)
+    for t in range(steps - 1, 0, -1):
+        V *= df
+        St = np.asarray(S[t], dtype=float)
+        h = exercise_value(St, K, option)
+        itm = h > 0
+        A = np.zeros((degree + 1, degree + 1))
+        b = np.zeros(degree + 1)
+        for c in chunks:
+            sel = itm[c]
+            X = _basis(St[c][sel] / K, degree)
+            A += X.T @ X
+            b += X.T @ V[c][sel]
+        if not itm.any():
+            continue
+        beta = np.linalg.lstsq(A, b, rcond=None)[0]
+        for c in chunks:
+            continuation = _basis(St[c] / K, degree) @ beta
+            exercise = itm[c] & (h[c] > continuation)
+            V[c] = np.where(exercise, h[c], V[c])
+    V *= df
+    # at t = 0 all paths share S0: exercise if it beats continuation
+    continuation = float(V.mean())
+    h0 = float(exercise_value(float(S[0, 0]), K, option))
+    if h0 > continuation:
+        return h0, 0.0
+    return continuation, float(V.std(ddof=1) / math.sqrt(paths))
+
+
+def lsm_american_value(S0, K, T, r, vol, option='put', steps=50,
+                       paths=100000, seed=None, degree=3, chunk_size=None):
+    ''' Simulates GBM paths and values an American option on them
+    with lsm_value; returns value and standard error. '''
+    dt = T / steps
+    S = gbm_paths(S0, r, vol, steps + 1, paths, seed, dt)[0]
+    return lsm_value(S, K, r, dt, option, degree, chunk_size)
@@ -0,0 +1,277 @@
+#
+# Streaming Monte Carlo Engine with Bounded Memory
+# dawp_jg/MC_engine.py
+#
+# Paths are generated chunk by chunk, reduced to statistics
+# and discarded before the next chunk is generated
+#
+import math
+import functools
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from GBM import gbm_paths, random_state
+
+#
+# Reducers
+#
+
+
+class MomentsReducer(object):
+    ''' Running mean, variance and standard error of a sample.
+
+    Chunks are combined with the parallel (Chan et al.) form of
+    Welford's update, so reducers of different chunks or processes
+    can be merged.
+    '''
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def _combine(self, n, mean, m2):
+        total = self.n + n
+        if total == 0:
+            return
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta ** 2 * self.n * n / total
+        self.n = total
+
+    def update(self, values):
+        ''' Adds a chunk of sample values. '''
+        values = np.asarray(values, dtype=float).ravel()
+        if values.size == 0:
+            return
+        mean = float(values.mean())
+        self._combine(values.size, mean,
+                      float(np.sum((values - mean) ** 2)))
+
+    def merge(self, other):
+        ''' Adds the sample summarized by another MomentsReducer. '''
+        self._combine(other.n, other.mean, other.m2)
+
+    @property
+    def variance(self):
+        return self.m2 / (self.n - 1) if self.n > 1 else np.nan
+
+    @property
+    def std_error(self):
+        return math.sqrt(self.variance / self.n) if self.n > 1 else np.inf
+
+    def result(self):
+        return {'n': self.n, 'mean': self.mean, 'variance': self.variance,
+                'std_error': self.std_error}
+
+
+class CovarianceReducer(object):
+    ''' Running means, variances and covariance of paired samples
+    (x, y), mergeable like MomentsReducer.
+    '''
+
+    def __init__(self):
+        self.n = 0
+        self.mean_x = 0.0
+        self.mean_y = 0.0
+        self.m2x = 0.0
+        self.m2y = 0.0
+        self.cxy = 0.0
+
+    def _combine(self, n, mean_x, mean_y, m2x, m2y, cxy):
+        total = self.n + n
+        if total == 0:
+            return
+        dx = mean_x - self.mean_x
+        dy = mean_y - self.mean_y
+        f = self.n * n / total
+        self.mean_x += dx * n / total
+        self.mean_y += dy * n / total
+        self.m2x += m2x + dx ** 2 * f
+        self.m2y += m2y + dy ** 2 * f
+        self.cxy += cxy + dx * dy * f
+        self.n = total
+
+    def update(self, x, y):
+        ''' Adds a chunk of paired sample values. '''
+        x = np.asarray(x, dtype=float).ravel()
+        y = np.asarray(y, dtype=float).ravel()
+        if x.size == 0:
+            return
+        mx, my = float(x.mean()), float(y.mean())
+        self._combine(x.size, mx, my, float(np.sum((x - mx) ** 2)),
+                      float(np.sum((y - my) ** 2)),
+                      float(np.sum((x - mx) * (y - my))))
+
+    def merge(self, other):
+        ''' Adds the samples summarized by another CovarianceReducer. '''
+        self._combine(other.n, other.mean_x, other.mean_y,
+                      other.m2x, other.m2y, other.cxy)
+
+    @property
+    def var_x(self):
+        return self.m2x / (self.n - 1) if self.n > 1 else np.nan
+
+    @property
+    def var_y(self):
+        return self.m2y / (self.n - 1) if self.n > 1 else np.nan
+
+    @property
+    def cov(self):
+        return self.cxy / (self.n - 1) if self.n > 1 else np.nan
+
+
+class QuantileReducer(object):
+    ''' Approximate quantiles of a sample from a fixed-bin histogram
+    on [lo, hi] (values outside are counted in the outer bins).
+
+    Memory is fixed by the number of bins; reducers with the same
+    bins can be merged.
+    '''
+
+    def __init__(self, probs, lo, hi, bins=10000):
+        self.probs = np.atleast_1d(np.asarray(probs, dtype=float))
+        self.edges = np.linspace(lo, hi, bins + 1)
+        self.counts = np.zeros(bins, dtype=np.int64)
+
+    def update(self, values):
+        ''' Adds a chunk of sample values. '''
+        values = np.clip(np.asarray(values, dtype=float).ravel(),
+                         self.edges[0], self.edges[-1])
+        self.counts += np.histogram(values, bins=self.edges)[0]
+
+    def merge(self, other):
+        ''' Adds the sample summarized by another QuantileReducer. '''
+        self.counts += other.counts
+
+    def result(self):
+        ''' Returns the quantiles for self.probs. '''
+        cum = np.concatenate([[0], np.cumsum(self.counts)])
+        return np.interp(self.probs * cum[-1], cum, self.edges)
+
+#
+# Path Generators
+#
+
+
+def _gbm_chunk(S0, r, vol, steps, dt, dtype, paths, rng):
+    return gbm_paths(S0, r, vol, steps + 1, paths, rng, dt, dtype)[0]
+
+
+def gbm_generator(S0, r, vol, steps, dt=1 / 252., dtype=np.float64):
+    ''' Returns a (picklable) path generator function(paths, rng)
+    producing GBM paths of shape (steps + 1, paths). '''
+    return functools.partial(_gbm_chunk, S0, r, vol, steps, dt, dtype)
+
+#
+# Streaming Engine
+#
+
+
+def stream_mc(generator, payoff, reducers, paths, chunk_size=10000,
+              seed=None, target_se=None):
+    ''' Runs a Monte Carlo simulation in chunks of paths.
+
+    Parameters
+    ==========
+    generator : callable
+        generator(n, rng) returning an array of n paths, e.g. gbm_generator
+    payoff : callable
+        payoff(chunk) returning one value per path
+    reducers : dict
+        reducers (objects with an update method) fed with the payoff values
+    paths : int
+        (maximum) number of paths
+    chunk_size : int
+        number of paths generated at once (bounds peak memory)
+    seed : int or generator
+        seed or random number generator
+    target_se : float
+        if given, stop once the standard error of reducers['mean']
+        (a MomentsReducer) falls below target_se
+
+    Returns
+    =======
+    reducers : dict
+        the updated reducers
+    paths : int
+        number of paths actually simulated
+    '''
+    rng = random_state(seed)
+    done = 0
+    while done < paths:
+        n = min(chunk_size, paths - done)
+        values = payoff(generator(n, rng))
+        for reducer in reducers.values():
+            reducer.update(values)
+        done += n
+        if target_se is not None and \
+                reducers['mean'].std_error <= target_se:
+            break
+    return reducers, done
+
+
+#
+# Parallel Engine
+#
+
+
+def _run_batch(generator, payoff, reducer_factory, paths, chunk_size,
+               seed_sequence):
+    ''' Worker: streams one batch of paths with its own random stream. '''
+    rng = np.random.default_rng(seed_sequence)
+    reducers, done = stream_mc(generator, payoff, reducer_factory(), paths,
+                               chunk_size, rng)
+    return reducers
+
+
+def parallel_mc(generator, payoff, reducer_factory, paths,
+                batch_size=100000, chunk_size=10000, seed=None,
+                workers=None):
+    ''' Runs a Monte Carlo simulation in batches over a process pool.
+
+    Every batch gets its own independent Generator stream spawned from
+    one root SeedSequence, and the batch reducers are merged in batch
+    order. The result therefore only depends on seed, paths and
+    batch_size, not on the number of workers.
+
+    Parameters
+    ==========
+    generator, payoff : callable
+        as for stream_mc; must be picklable (module-level functions or
+        functools.partial objects, e.g. gbm_generator)
+    reducer_factory : callable
+        returns a fresh dict of mergeable reducers
+    paths : int
+        number of paths
+    batch_size : int
+        number of paths per batch (unit of work and of random streams)
+    chunk_size : int
+        number of paths generated at once within a batch
+    seed : int or SeedSequence
+        root seed
+    workers : int
+        number of worker processes (default: number of CPUs);
+        workers=1 runs all batches in the current process
+
+    Returns
+    =======
+    reducers : dict
+        the merged reducers
+    '''
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    sizes = [min(batch_size, paths - start)
+             for start in range(0, paths, batch_size)]
+    streams = seed.spawn(len(sizes))
+    args = [(generator, payoff, reducer_factory, n, chunk_size, stream)
+            for n, stream in zip(sizes, streams)]
+    if workers == 1:
+        results = [_run_batch(*a) for a in args]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_run_batch, *zip(*args)))
+    reducers = reducer_factory()
+    for batch in results:
+        for name, reducer in reducers.items():
+            reducer.merge(batch[name])
+    return reducers
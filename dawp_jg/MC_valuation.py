@@ -0,0 +1,160 @@
+#
+# Monte Carlo Valuation of European and Path-Dependent Options
+# with Variance Reduction
+# dawp_jg/MC_valuation.py
+#
+import math
+import functools
+import numpy as np
+from GBM import gbm_from_normals
+from MC_engine import MomentsReducer, CovarianceReducer, stream_mc
+from BSM_option_valuation import BSM_call_value
+
+#
+# Payoff Functions
+#
+
+
+def _european_call(K, S):
+    return np.maximum(S[-1] - K, 0)
+
+
+def _asian_call(K, S):
+    return np.maximum(S[1:].mean(axis=0) - K, 0)
+
+
+def european_call(K):
+    ''' Returns the payoff function of a European call with strike K. '''
+    return functools.partial(_european_call, K)
+
+
+def asian_call(K):
+    ''' Returns the payoff function of an arithmetic average call
+    with strike K (average over the simulated time steps). '''
+    return functools.partial(_asian_call, K)
+
+#
+# Variance-Reduced Paths and Samples
+#
+
+
+def _vr_gbm_chunk(S0, r, vol, steps, dt, antithetic, moment_matching,
+                  paths, rng):
+    ''' Path generator for stream_mc: GBM paths of shape (steps + 1, paths)
+    from antithetic and/or moment matched normals; with antithetic
+    variates (paths even) the second half mirrors the first. '''
+    z = np.empty((steps + 1, paths))
+    half = paths // 2 if antithetic else paths
+    z[1:, :half] = rng.standard_normal((steps, half))
+    if antithetic:
+        z[1:, half:] = -z[1:, :half]
+    if moment_matching and paths > 1:
+        z[1:] -= z[1:].mean(axis=1, keepdims=True)
+        z[1:] /= z[1:].std(axis=1, keepdims=True)
+    return gbm_from_normals(S0, r, vol, z, dt)
+
+
+def _mc_samples(payoff, df, K, control_variate, antithetic, S):
+    ''' Payoff function for stream_mc: returns the discounted plain
+    payoffs and the (pair averaged) control and payoff samples. '''
+    y = df * payoff(S)
+    x = df * _european_call(K, S) if control_variate else np.zeros_like(y)
+    if antithetic:
+        half = len(y) // 2
+        return y, (x[:half] + x[half:]) / 2, (y[:half] + y[half:]) / 2
+    return y, x, y
+
+
+class _SampleReducer(object):
+    ''' Reduces the samples of _mc_samples: moments of the plain payoffs
+    and covariance of the control and payoff samples. '''
+
+    def __init__(self):
+        self.plain = MomentsReducer()
+        self.estimate = CovarianceReducer()
+
+    def update(self, values):
+        y, x, y_sample = values
+        self.plain.update(y)
+        self.estimate.update(x, y_sample)
+
+#
+# Valuation
+#
+
+
+def mc_value(S0, K, T, r, vol, payoff, steps=50, paths=100000,
+             antithetic=False, moment_matching=False, control_variate=False,
+             chunk_size=10000, seed=None):
+    ''' Monte Carlo value of an option on a GBM with selectable
+    variance reduction.
+
+    Parameters
+    ==========
+    S0 : float
+        initial index level
+    K : float
+        strike price (of the control variate)
+    T : float
+        maturity (in year fractions)
+    r : float
+        risk-less short rate
+    vol : float
+        volatility
+    payoff : callable
+        payoff(S) for paths S of shape (steps + 1, n), e.g. asian_call(K)
+    steps : int
+        number of time steps
+    paths : int
+        number of paths (rounded down to an even number, at least 2,
+        with antithetic variates)
+    antithetic : bool
+        use antithetic variates (pairs z, -z)
+    moment_matching : bool
+        match mean and standard deviation of the random numbers per
+        time step and chunk (chunks of a single path are left as drawn)
+    control_variate : bool
+        use the European call with strike K as control variate, with
+        its analytic value from BSM_option_valuation.BSM_call_value
+    chunk_size : int
+        number of paths generated at once
+    seed : int or generator
+        seed or random number generator
+
+    Returns
+    =======
+    results : dict
+        'value', 'std_error', 'paths', 'plain_std_error' (standard error
+        plain MC would have with the same number of paths) and 'speedup'
+        (ratio of plain to achieved variance, i.e. the path saving);
+        with moment matching the standard error is the (conservative)
+        i.i.d. estimate, as the matched samples are not independent
+    '''
+    if antithetic:
+        # whole antithetic pairs only, also within every chunk
+        paths = max(2, paths - paths % 2)
+        chunk_size = max(2, chunk_size - chunk_size % 2)
+    generator = functools.partial(_vr_gbm_chunk, S0, r, vol, steps,
+                                  T / steps, antithetic, moment_matching)
+    samples = functools.partial(_mc_samples, payoff, math.exp(-r * T), K,
+                                control_variate, antithetic)
+    reducers, done = stream_mc(generator, samples,
+                               {'samples': _SampleReducer()}, paths,
+                               chunk_size, seed)
+    plain = reducers['samples'].plain
+    estimate = reducers['samples'].estimate
+
+    value = estimate.mean_y
+    variance = estimate.var_y
+    if control_variate and estimate.var_x > 0:
+        beta = estimate.cov / estimate.var_x
+        value -= beta * (estimate.mean_x -
+                         float(BSM_call_value(S0, K, 0, T, r, vol)))
+        variance = (estimate.var_y - 2 * beta * estimate.cov
+                    + beta ** 2 * estimate.var_x)
+    std_error = math.sqrt(max(variance, 0.0) / estimate.n)
+    plain_std_error = math.sqrt(plain.variance / done)
+    return {'value': value, 'std_error': std_error, 'paths': done,
+            'plain_std_error': plain_std_error,
+            'speedup': (plain_std_error / std_error) ** 2
+            if std_error > 0 else np.inf}
@@ -0,0 +1,132 @@
+#
+# Indexed Local Store for Option Quotes
+# dawp_jg/option_quote_store.py
+#
+# Columnar, memory-mappable storage of option quotes
+# partitioned by pricing date and maturity
+#
+import os
+import numpy as np
+import pandas as pd
+
+
+class OptionQuoteStore(object):
+    ''' Columnar on-disk store for option quotes.
+
+    Every column is kept in its own .npy file, with rows sorted by
+    pricing date and maturity, so every (date, maturity) partition is a
+    contiguous row range. A small index file maps the partitions to
+    their row ranges; queries memory-map the column files and only
+    touch the bytes of the requested partitions. Only numeric, boolean
+    and datetime columns (and row index) can be memory-mapped; the row
+    index is stored with the quotes and returned in sorted row order.
+
+    Attributes
+    ==========
+    path: str
+        directory of the store
+    date_col: str
+        name of the pricing date column
+    maturity_col: str
+        name of the maturity column
+
+    Methods
+    =======
+    write:
+        writes a DataFrame of quotes to a new store
+    exists:
+        checks whether a store has been written to path
+    load:
+        returns the quotes for a date/maturity slice
+    '''
+
+    index_file = '_index.npy'
+    columns_file = '_columns.npy'
+    rows_file = '_rows.npy'
+
+    def __init__(self, path, date_col='Date', maturity_col='Maturity'):
+        self.path = path
+        self.date_col = date_col
+        self.maturity_col = maturity_col
+        self._index = None
+
+    @classmethod
+    def write(cls, path, data, date_col='Date', maturity_col='Maturity'):
+        ''' Writes the quotes in data to a store at path.
+        '''
+        data = data.sort_values([date_col, maturity_col], kind='mergesort')
+        arrays = [(col, np.asarray(data[col].values)) for col in data.columns]
+        arrays.append((None, np.asarray(data.index.values)))
+        for col, values in arrays:
+            # object (e.g. string) arrays cannot be memory-mapped
+            if values.dtype.kind not in 'biufcmM':
+                raise TypeError("%s has dtype %s; only numeric, boolean "
+                                "and datetime data can be stored." %
+                                ('Row index' if col is None
+                                 else 'Column %s' % col, values.dtype))
+        if not os.path.exists(path):
+            os.makedirs(path)
+        np.save(os.path.join(path, cls.columns_file),
+                np.array(list(data.columns), dtype=str))
+        for col, values in arrays:
+            np.save(os.path.join(path, cls.rows_file if col is None
+                                 else '%s.npy' % col), values)
+        keys = data[[date_col, maturity_col]]
+        starts = np.flatnonzero(keys.ne(keys.shift()).any(axis=1).values)
+        stops = np.append(starts[1:], len(data))
+        index = np.zeros(len(starts), dtype=[('date', 'datetime64[ns]'),
+                                             ('maturity', 'datetime64[ns]'),
+                                             ('start', 'i8'), ('stop', 'i8')])
+        index['date'] = keys[date_col].values[starts]
+        index['maturity'] = keys[maturity_col].values[starts]
+        index['start'] = starts
+        index['stop'] = stops
+        np.save(os.path.join(path, cls.index_file), index)
+        return cls(path, date_col, maturity_col)
+
+    def exists(self):
+        ''' Checks whether a store has been written to self.path.
+        '''
+        return os.path.exists(os.path.join(self.path, self.index_file))
+
+    @property
+    def index(self):
+        ''' Partition index (date, maturity, start, stop).
+        '''
+        if self._index is None:
+            self._index = np.load(os.path.join(self.path, self.index_file))
+        return self._index
+
+    @property
+    def columns(self):
+        ''' Names of the stored columns.
+        '''
+        return list(np.load(os.path.join(self.path, self.columns_file)))
+
+    def load(self, date=None, maturity=None, columns=None):
+        ''' Returns the quotes for the given pricing date and/or maturity
+        (all partitions if None) as a DataFrame with their original
+        row index (in the stored, sorted row order).
+        '''
+        index = self.index
+        mask = np.ones(len(index), dtype=bool)
+        if date is not None:
+            mask &= index['date'] == np.datetime64(pd.Timestamp(date), 'ns')
+        if maturity is not None:
+            mask &= index['maturity'] == np.datetime64(
+                pd.Timestamp(maturity), 'ns')
+        parts = index[mask]
+        if columns is None:
+            columns = self.columns
+        data = {}
+        for col in columns + [None]:
+            filename = os.path.join(self.path, self.rows_file if col is None
+                                    else '%s.npy' % col)
+            if col is None and not os.path.exists(filename):
+                break  # stores without row index
+            values = np.load(filename, mmap_mode='r')
+            data[col] = np.concatenate(
+                [values[p['start']:p['stop']] for p in parts]
+                or [values[:0]])
+        rows = data.pop(None, None)
+        return pd.DataFrame(data, columns=columns, index=rows)
@@ -0,0 +1,121 @@
+#
+# Process-Parallel BSM Implied Volatilities
+# for Option Quotes over Many Pricing Dates and Maturities
+# dawp_jg/parallel_imp_vol.py
+#
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from BSM_implied_vol import imp_vol_rational
+
+# rows of the shared input block
+_fields = ['S0', 'K', 'T', 'r', 'C0']
+
+
+def _imp_vol_task(in_name, out_name, n, start, stop):
+    ''' Worker: inverts the quotes in rows start:stop of the shared
+    input block and writes them into the shared output block. '''
+    shm_in = shared_memory.SharedMemory(name=in_name)
+    shm_out = shared_memory.SharedMemory(name=out_name)
+    try:
+        quotes = np.ndarray((len(_fields), n), dtype=float,
+                            buffer=shm_in.buf)
+        imp_vols = np.ndarray((n,), dtype=float, buffer=shm_out.buf)
+        S0, K, T, r, C0 = quotes[:, start:stop]
+        imp_vols[start:stop] = imp_vol_rational(S0, K, T, r, C0)
+        del quotes, imp_vols
+    finally:
+        shm_in.close()
+        shm_out.close()
+    return start, stop
+
+
+def _tasks(keys, min_rows):
+    ''' Groups consecutive (date, maturity) shards into row ranges of at
+    least min_rows rows without splitting a shard. '''
+    bounds = np.flatnonzero(keys.ne(keys.shift()).any(axis=1).values)
+    bounds = np.append(bounds, len(keys))
+    tasks = []
+    start = 0
+    for stop in bounds[1:]:
+        if stop - start >= min_rows or stop == len(keys):
+            tasks.append((start, stop))
+            start = stop
+    return tasks
+
+
+def parallel_imp_vols(data, S0, r, tol=0.30, workers=None, min_rows=2000):
+    ''' Calculate the implied volatilities of all call quotes in data
+    (columns Date, Maturity, Strike, Call) in a process pool.
+
+    The quotes within the moneyness tolerance are sorted by pricing
+    date and maturity, copied once into shared memory and inverted in
+    tasks made of whole (date, maturity) shards. Every task writes its
+    own row range of a shared result array, so the merged result does
+    not depend on the number of workers or on scheduling.
+
+    Parameters
+    ==========
+    data: DataFrame
+        option quotes
+    S0: float or Series
+        index level, or index levels per pricing date
+    r: float
+        constant risk-free short rate
+    tol: float
+        tolerance for moneyness of the options
+    workers: int
+        number of worker processes (default: number of CPUs)
+    min_rows: int
+        minimum number of quotes per task
+
+    Returns
+    =======
+    data: DataFrame
+        data with column Imp_Vol (0 for quotes outside the tolerance)
+    '''
+    t = data['Date'].values
+    T = data['Maturity'].values
+    ttm = ((T - t) // np.timedelta64(1, 'D')) / 365.
+    if isinstance(S0, pd.Series):
+        S0 = S0.reindex(pd.DatetimeIndex(data['Date'])).values
+    S0 = np.broadcast_to(np.asarray(S0, dtype=float), ttm.shape)
+    strike = data['Strike'].values.astype(float)
+    forward = np.exp(r * ttm) * S0
+    eligible = np.flatnonzero((np.abs(strike - forward) / forward) < tol)
+    keys = data[['Date', 'Maturity']].iloc[eligible]
+    order = np.lexsort((keys['Maturity'].values, keys['Date'].values))
+    rows = eligible[order]
+    n = len(rows)
+
+    imp_vol = np.zeros(len(data))
+    if n > 0:
+        shm_in = shared_memory.SharedMemory(
+            create=True, size=len(_fields) * n * 8)
+        shm_out = shared_memory.SharedMemory(create=True, size=n * 8)
+        try:
+            quotes = np.ndarray((len(_fields), n), dtype=float,
+                                buffer=shm_in.buf)
+            quotes[0] = S0[rows]
+            quotes[1] = strike[rows]
+            quotes[2] = ttm[rows]
+            quotes[3] = r
+            quotes[4] = data['Call'].values[rows]
+            tasks = _tasks(keys.iloc[order], min_rows)
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(_imp_vol_task, shm_in.name,
+                                       shm_out.name, n, start, stop)
+                           for start, stop in tasks]
+                for future in futures:
+                    future.result()
+            imp_vol[rows] = np.ndarray((n,), dtype=float,
+                                       buffer=shm_out.buf)
+            del quotes
+        finally:
+            shm_in.close()
+            shm_in.unlink()
+            shm_out.close()
+            shm_out.unlink()
+    data['Imp_Vol'] = imp_vol
+    return data
@@ -0,0 +1,235 @@
+#
+# SVI Smile Calibration for BSM Implied Volatilities
+# dawp_jg/svi_calibration.py
+#
+# Raw SVI parametrization of total implied variance
+# w(k) = a + b * (rho * (k - m) + sqrt((k - m) ** 2 + sigma ** 2))
+# with log-moneyness k = log(K / F)
+#
+import time
+import numpy as np
+import matplotlib.pyplot as plt
+
+# order of the parameters in all parameter arrays
+svi_parameters = ['a', 'b', 'rho', 'm', 'sigma']
+
+
+def svi_total_variance(k, params):
+    ''' Returns SVI total implied variances w(k).
+
+    Parameters
+    ==========
+    k : array
+        log-moneyness, shape (..., n)
+    params : array
+        SVI parameters (a, b, rho, m, sigma), shape (..., 5)
+
+    Returns
+    =======
+    w : array
+        total implied variances, shape (..., n)
+    '''
+    a, b, rho, m, sigma = [params[..., i, None] for i in range(5)]
+    u = k - m
+    return a + b * (rho * u + np.sqrt(u ** 2 + sigma ** 2))
+
+
+def svi_jacobian(k, params):
+    ''' Returns the analytic Jacobian of w(k) with respect to the
+    parameters, shape (..., n, 5). '''
+    a, b, rho, m, sigma = [params[..., i, None] for i in range(5)]
+    u = k - m
+    R = np.sqrt(u ** 2 + sigma ** 2)
+    return np.stack([np.ones_like(u), rho * u + R, b * u,
+                     -b * (rho + u / R), b * sigma / R], axis=-1)
+
+
+def _project(params):
+    ''' Clips parameters to the admissible SVI domain. '''
+    params[..., 1] = np.maximum(params[..., 1], 0.0)
+    params[..., 2] = np.clip(params[..., 2], -0.999, 0.999)
+    params[..., 4] = np.maximum(params[..., 4], 1e-4)
+    return params
+
+
+def svi_initial_guess(k, w, weights):
+    ''' Returns a generic starting point per smile. '''
+    w_masked = np.where(weights > 0, w, np.inf)
+    j = np.argmin(w_masked, axis=-1)
+    rows = np.arange(len(k))
+    x0 = np.empty((len(k), 5))
+    x0[:, 0] = w[rows, j]
+    x0[:, 1] = 0.1
+    x0[:, 2] = -0.3
+    x0[:, 3] = k[rows, j]
+    x0[:, 4] = 0.1
+    return x0
+
+
+def calibrate_svi(k, w, weights=None, x0=None, it=200, tol=1e-10):
+    ''' Fits SVI parameters to several smiles at once with a batched
+    Levenberg-Marquardt iteration using the analytic Jacobian.
+
+    Smiles with fewer points are padded; padded points get weight 0.
+    Every smile has its own damping factor and stops iterating once
+    the relative improvement of its residual falls below tol or the
+    step becomes negligible.
+
+    Parameters
+    ==========
+    k : array
+        log-moneyness, shape (smiles, points)
+    w : array
+        total implied variances (iv ** 2 * T), shape (smiles, points)
+    weights : array
+        weights of the squared residuals (default 1)
+    x0 : array
+        starting parameters, shape (smiles, 5), e.g. the previous fit
+    it : int
+        maximum number of iterations
+    tol : float
+        relative tolerance on the residual sum of squares
+
+    Returns
+    =======
+    params : array
+        fitted SVI parameters, shape (smiles, 5)
+    info : dict
+        'iterations' and 'rss' per smile, 'time' in seconds
+    '''
+    start_time = time.perf_counter()
+    k = np.atleast_2d(np.asarray(k, dtype=float))
+    w = np.atleast_2d(np.asarray(w, dtype=float))
+    if weights is None:
+        weights = np.ones_like(w)
+    weights = np.where(np.isfinite(w), weights, 0.0)
+    w = np.where(weights > 0, w, 0.0)
+    sw = np.sqrt(weights)
+    if x0 is None:
+        x0 = svi_initial_guess(k, w, weights)
+    params = _project(np.array(x0, dtype=float))
+    n = len(params)
+    lam = np.full(n, 1e-3)
+    iterations = np.zeros(n, dtype=int)
+    rss = np.sum((sw * (svi_total_variance(k, params) - w)) ** 2, axis=-1)
+    idx = np.arange(n)
+    eye = np.eye(5)
+
+    for i in range(it):
+        if idx.size == 0:
+            break
+        k_, w_, sw_, p = k[idx], w[idx], sw[idx], params[idx]
+        res = sw_ * (svi_total_variance(k_, p) - w_)
+        J = sw_[..., None] * svi_jacobian(k_, p)
+        A = np.einsum('spi,spj->sij', J, J)
+        g = np.einsum('spi,sp->si', J, res)
+        diag = np.einsum('sii->si', A)
+        A_damped = A + lam[idx, None, None] * (diag[..., None] * eye
+                                               + 1e-12 * eye)
+        step = np.linalg.solve(A_damped, -g[..., None])[..., 0]
+        p_new = _project(p + step)
+        rss_new = np.sum((sw_ * (svi_total_variance(k_, p_new) - w_)) ** 2,
+                         axis=-1)
+        iterations[idx] += 1
+        better = rss_new < rss[idx]
+        improvement = np.where(better, rss[idx] - rss_new, 0.0)
+        params[idx[better]] = p_new[better]
+        rss[idx[better]] = rss_new[better]
+        lam[idx] = np.where(better, lam[idx] / 3., lam[idx] * 2.)
+        small_step = (np.linalg.norm(step, axis=-1)
+                      <= 1e-10 * (1 + np.linalg.norm(p, axis=-1)))
+        done = ((better & (improvement <= tol * np.maximum(rss[idx], tol)))
+                | small_step | (lam[idx] > 1e10))
+        idx = idx[~done]
+
+    info = {'iterations': iterations, 'rss': rss,
+            'time': time.perf_counter() - start_time}
+    return params, info
+
+
+class SVICalibrator(object):
+    ''' Calibrates SVI smiles for all maturities of an implied
+    volatility data set, warm-starting from the previous fit.
+
+    Attributes
+    ==========
+    r: float
+        constant risk-free short rate
+    params: dict
+        last fitted parameters per maturity
+    history: list
+        calibration time, iterations and maturities per call of fit
+
+    Methods
+    =======
+    fit:
+        calibrates one smile per maturity in one batch
+    implied_volatility:
+        returns fitted implied volatilities
+    '''
+
+    def __init__(self, r):
+        self.r = r
+        self.params = {}
+        self.history = []
+
+    def _smiles(self, data, S0):
+        ''' Builds padded log-moneyness/total variance arrays. '''
+        data = data[data['Imp_Vol'] > 0]
+        maturities = sorted(set(data['Maturity']))
+        groups = [data[data['Maturity'] == mat] for mat in maturities]
+        points = max(len(g) for g in groups)
+        k = np.zeros((len(groups), points))
+        w = np.zeros((len(groups), points))
+        weights = np.zeros((len(groups), points))
+        for i, g in enumerate(groups):
+            ttm = ((g['Maturity'] - g['Date']).dt.days / 365.).values
+            forward = S0 * np.exp(self.r * ttm)
+            n = len(g)
+            k[i, :n] = np.log(g['Strike'].values / forward)
+            w[i, :n] = g['Imp_Vol'].values ** 2 * ttm
+            weights[i, :n] = 1.0
+        return maturities, k, w, weights
+
+    def fit(self, data, S0):
+        ''' Calibrates SVI parameters for every maturity in data
+        (columns Date, Maturity, Strike, Imp_Vol) in one batch.
+        '''
+        maturities, k, w, weights = self._smiles(data, S0)
+        x0 = svi_initial_guess(k, w, weights)
+        for i, mat in enumerate(maturities):
+            if mat in self.params:
+                x0[i] = self.params[mat]
+        params, info = calibrate_svi(k, w, weights, x0)
+        for i, mat in enumerate(maturities):
+            self.params[mat] = params[i]
+        self.history.append({'maturities': maturities,
+                             'iterations': info['iterations'],
+                             'time': info['time']})
+        return params, info
+
+    def implied_volatility(self, maturity, k, ttm):
+        ''' Returns fitted implied volatilities for log-moneyness k. '''
+        w = svi_total_variance(np.asarray(k, dtype=float),
+                               self.params[maturity][None, :])[0]
+        return np.sqrt(np.maximum(w, 0.0) / ttm)
+
+
+def plot_svi_fits(data, calibrator, S0):
+    ''' Plots the implied volatilities and the fitted SVI smiles. '''
+    plt.figure(figsize=(10, 5))
+    data = data[data['Imp_Vol'] > 0]
+    for mat in sorted(set(data['Maturity'])):
+        dat = data[data['Maturity'] == mat]
+        ttm = (mat - dat['Date'].iloc[0]).days / 365.
+        strikes = np.linspace(dat['Strike'].min(), dat['Strike'].max(), 100)
+        k = np.log(strikes / (S0 * np.exp(calibrator.r * ttm)))
+        line, = plt.plot(strikes,
+                         calibrator.implied_volatility(mat, k, ttm),
+                         label=str(mat)[:10])
+        plt.plot(dat['Strike'].values, dat['Imp_Vol'].values, '.',
+                 color=line.get_color())
+    plt.grid()
+    plt.legend()
+    plt.xlabel('strike')
+    plt.ylabel('implied volatility')
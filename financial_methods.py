@@ -1,4 +1,103 @@
+import numpy as np
+from scipy.special import ndtr
 
+# status codes returned by bsm_call_imp_vol_batch
+IV_CONVERGED = 0
+IV_MAX_ITER = 1
+IV_NO_SOLUTION = 2
+IV_ILL_CONDITIONED = 3
+
+
+def _ndtr_pdf(x):
+    ''' Probability density function of the standard normal distribution. '''
+    return np.exp(-0.5 * x ** 2) / np.sqrt(2 * np.pi)
+
+
+def _bsm_d1_d2(S0, K, T, r, sigma):
+    ''' Helper function returning d1, d2 and sqrt(T) as broadcast arrays. '''
+    S0 = np.asarray(S0, dtype=float)
+    sqrt_T = np.sqrt(T)
+    d1 = (np.log(S0 / K) + (r + 0.5 * sigma ** 2) * T) / (sigma * sqrt_T)
+    d2 = (np.log(S0 / K) + (r - 0.5 * sigma ** 2) * T) / (sigma * sqrt_T)
+    return d1, d2, sqrt_T
+
+
+def bsm_call_value_vec(S0, K, T, r, sigma):
+    '''
+    Valuation of European call options in BSM model for whole arrays.
+    Analytical Formula
+
+    Parameters
+    ==========
+    S0 : float or array
+        initial stock/index level
+    K : float or array
+        strike price
+    T : float or array
+        maturity date (in year fractions)
+    r : float or array
+        constant risk-free short rate
+    sigma : float or array
+        volatility factor in diffusion term
+
+    All parameters are broadcast against each other.
+
+    Returns
+    =======
+    value : ndarray
+        present values of European call options
+    '''
+
+    d1, d2, sqrt_T = _bsm_d1_d2(S0, K, T, r, sigma)
+    value = S0 * ndtr(d1) - K * np.exp(-r * T) * ndtr(d2)
+    return value
+
+
+def bsm_vega_vec(S0, K, T, r, sigma):
+    '''
+    Vega of European options in BSM Model for whole arrays.
+
+    Parameters see bsm_call_value_vec.
+
+    Returns
+    =======
+    vega: ndarray
+        partial derivatives of BSM formula with respect to sigma
+    '''
+
+    d1, d2, sqrt_T = _bsm_d1_d2(S0, K, T, r, sigma)
+    vega = S0 * _ndtr_pdf(d1) * sqrt_T
+    return vega
+
+
+def bsm_call_greeks(S0, K, T, r, sigma):
+    '''
+    Value and Greeks of European call options in BSM Model in a single pass.
+
+    Parameters see bsm_call_value_vec.
+
+    Returns
+    =======
+    greeks : dict
+        ndarrays for 'value', 'delta', 'gamma', 'vega', 'theta' and 'rho';
+        theta is the derivative with respect to calendar time (per year)
+    '''
+
+    S0 = np.asarray(S0, dtype=float)
+    d1, d2, sqrt_T = _bsm_d1_d2(S0, K, T, r, sigma)
+    Nd1 = ndtr(d1)
+    Nd2 = ndtr(d2)
+    nd1 = _ndtr_pdf(d1)
+    disc_K = K * np.exp(-r * T)
+    greeks = {
+        'value': S0 * Nd1 - disc_K * Nd2,
+        'delta': Nd1,
+        'gamma': nd1 / (S0 * sigma * sqrt_T),
+        'vega': S0 * nd1 * sqrt_T,
+        'theta': -S0 * nd1 * sigma / (2 * sqrt_T) - r * disc_K * Nd2,
+        'rho': T * disc_K * Nd2,
+    }
+    return greeks
 
 
 def bsm_call_value(S0, K, T, r, sigma):
@@ -27,14 +126,7 @@ def bsm_call_value(S0, K, T, r, sigma):
 
     '''
 
-    from math import log, sqrt, exp
-    from scipy import stats
-
-    S0 = float(S0)
-    d1 = (log(S0/K) + (r + 0.5 * sigma ** 2) * T)/ (sigma * sqrt(T))
-    d2 = (log(S0/K) + (r - 0.5 * sigma ** 2) * T)/ (sigma * sqrt(T))
-    value = (S0 * stats.norm.cdf(d1, 0.0, 1.0) - K )* exp(-r * T) * stats.norm.cdf(d2, 0.0, 1.0)
-    return value
+    return float(bsm_call_value_vec(float(S0), K, T, r, sigma))
 
 def bsm_vega(S0, K, T, r, sigma):
     '''
@@ -59,13 +151,108 @@ def bsm_vega(S0, K, T, r, sigma):
         partial derivative of BSM formula with respect to sigma
     '''
 
-    from math import sqrt, log
-    from scipy import stats
+    return float(bsm_vega_vec(float(S0), K, T, r, sigma))
 
-    S0 = float(S0)
-    d1 = (log(S0/K) + (r + 0.5 * sigma ** 2) * T)/ (sigma * sqrt(T))
-    vega = S0 * stats.norm.cdf(d1, 0.0, 1.0) *  sqrt(T)
-    return vega
+
+def bsm_call_imp_vol_batch(S0, K, T, r, C0, sigma_est=0.2, it=100,
+                           tol=1e-10, sigma_min=1e-6, sigma_max=10.0,
+                           sigma_tol=1e-6):
+    '''
+    Implied Volatilities of European Call Options in BSM Model for whole
+    arrays, using a safeguarded Newton/bisection iteration.
+
+    All options are iterated together; every option keeps a bracket
+    [lo, hi] around its implied volatility and takes a bisection step
+    whenever the Newton step leaves the bracket or vega vanishes. Options
+    are frozen as soon as they have converged.
+
+    A price match within tol only determines the volatility to about
+    tol / vega. Options matched with tol / vega > sigma_tol (vega too
+    small, e.g. deep in or out of the money) are flagged
+    IV_ILL_CONDITIONED instead of IV_CONVERGED.
+
+    Parameters
+    ==========
+    S0 : float or array
+        initial stock/index level
+    K : float or array
+        strike price
+    T : float or array
+        maturity date (in year fractions)
+    r : float or array
+        constant risk-free short rate
+    C0 : float or array
+        quoted call option prices
+    sigma_est: float or array
+        estimate of implied volatility
+    it : integer
+        maximum number of iterations
+    tol : float
+        absolute tolerance on the price difference
+    sigma_min, sigma_max : float
+        initial bracket for the implied volatility
+    sigma_tol : float
+        accuracy of the implied volatility required for IV_CONVERGED
+
+    Returns
+    =======
+    sigma : ndarray
+        estimated implied volatilities (NaN where no solution exists)
+    status : ndarray
+        IV_CONVERGED, IV_MAX_ITER, IV_NO_SOLUTION or IV_ILL_CONDITIONED
+        (price matched, volatility undetermined) per option
+    iterations : ndarray
+        number of iterations used per option
+    '''
+
+    S0, K, T, r, C0, sigma = np.broadcast_arrays(
+        *[np.asarray(x, dtype=float) for x in (S0, K, T, r, C0, sigma_est)])
+    shape = S0.shape
+    S0, K, T, r, C0 = [x.ravel() for x in (S0, K, T, r, C0)]
+    sigma = np.clip(sigma.ravel(), sigma_min, sigma_max)
+    n = sigma.size
+    status = np.full(n, IV_MAX_ITER, dtype=np.int8)
+    iterations = np.zeros(n, dtype=np.int32)
+    lo = np.full(n, sigma_min)
+    hi = np.full(n, sigma_max)
+
+    # quotes outside the attainable price range have no implied volatility
+    c_lo = bsm_call_value_vec(S0, K, T, r, lo)
+    c_hi = bsm_call_value_vec(S0, K, T, r, hi)
+    invalid = ~((C0 >= c_lo - tol) & (C0 <= c_hi + tol))
+    status[invalid] = IV_NO_SOLUTION
+    sigma[invalid] = np.nan
+
+    idx = np.flatnonzero(~invalid)
+    for i in range(it):
+        if idx.size == 0:
+            break
+        s = sigma[idx]
+        S0_, K_, T_, r_ = S0[idx], K[idx], T[idx], r[idx]
+        d1, d2, sqrt_T = _bsm_d1_d2(S0_, K_, T_, r_, s)
+        diff = (S0_ * ndtr(d1) - K_ * np.exp(-r_ * T_) * ndtr(d2)) - C0[idx]
+        iterations[idx] += 1
+        done = np.abs(diff) <= tol
+        vega = S0_ * _ndtr_pdf(d1) * sqrt_T
+        status[idx[done]] = np.where(vega[done] * sigma_tol >= tol,
+                                     IV_CONVERGED, IV_ILL_CONDITIONED)
+        # call value is increasing in sigma, so the sign of diff
+        # tells on which side of the root the current estimate lies
+        above = diff > 0
+        hi[idx] = np.where(above, s, hi[idx])
+        lo[idx] = np.where(above, lo[idx], s)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            s_new = s - diff / vega
+        l, h = lo[idx], hi[idx]
+        bisect = ~((s_new > l) & (s_new < h))
+        s_new[bisect] = 0.5 * (l[bisect] + h[bisect])
+        sigma[idx] = np.where(done, s, s_new)
+        keep = ~done & ((h - l) > tol * 1e-3)
+        status[idx[~done & ~keep]] = IV_CONVERGED
+        idx = idx[keep]
+
+    return (sigma.reshape(shape), status.reshape(shape),
+            iterations.reshape(shape))
 
 
 def bsm_call_imp_vol(S0, K, T, r, C0, sigma_est, it=100):
@@ -85,22 +272,14 @@ def bsm_call_imp_vol(S0, K, T, r, C0, sigma_est, it=100):
     sigma_est: float
         estimate of implied volatility
     it : integer
-        number of iteration
+        maximum number of iterations
 
     Returns
     =======
     sigma_est: float
-        numericalluy estimated implied volatility
-    '''        
-
-    for i in range(it):
-        bcv = (bsm_call_value(S0, K, T, r,sigma_est) - C0)
-
-        bv = bsm_vega(S0, K, T, r, sigma_est)
-
-        sigma_est -= (bcv/bv)
-    return sigma_est
-
-
-
+        numerically estimated implied volatility
+    '''
 
+    sigma, status, iterations = bsm_call_imp_vol_batch(
+        S0, K, T, r, C0, sigma_est, it)
+    return float(sigma)
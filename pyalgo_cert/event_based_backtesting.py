@@ -6,6 +6,7 @@
 # (c) Dr. Yves J. Hilpisch
 # The Python Quants GmbH
 #
+import os
 import math
 import numpy as np
 import pandas as pd
@@ -13,6 +14,101 @@ import matplotlib.pyplot as plt
 plt.style.use('seaborn')
 
 
+class EikonDataSource(object):
+    ''' End-of-day data source with a local per-symbol cache.
+
+    The CSV file is downloaded and parsed only once; afterwards every
+    symbol is kept as a memory-mapped NumPy record array (date, price)
+    in cache_dir and in memory, shared by all backtester instances of
+    the process. Requests only touch the requested symbol and rows.
+
+    Attributes
+    ==========
+    url: str
+        location of the CSV file with one column per symbol
+    cache_dir: str
+        directory of the per-symbol cache files
+
+    Methods
+    =======
+    get:
+        returns the prices of a symbol between start and end
+    '''
+
+    def __init__(self, url='http://hilpisch.com/tr_eikon_eod_data.csv',
+                 cache_dir='eikon_eod_cache'):
+        self.url = url
+        self.cache_dir = cache_dir
+        self._symbols = {}
+        self._downloaded = False
+
+    def _path(self, symbol):
+        return os.path.join(self.cache_dir, '%s.npy' % symbol)
+
+    def _download(self):
+        ''' Fetches the CSV file once and writes one cache file per symbol.
+        '''
+        raw = pd.read_csv(self.url, index_col=0, parse_dates=True).dropna()
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+        dates = raw.index.values.astype('datetime64[ns]')
+        for symbol in raw.columns:
+            rec = np.empty(len(raw), dtype=[('date', 'datetime64[ns]'),
+                                            ('price', 'f8')])
+            rec['date'] = dates
+            rec['price'] = raw[symbol].values
+            np.save(self._path(symbol), rec)
+        self._downloaded = True
+
+    def _load(self, symbol):
+        ''' Returns the dates (as DatetimeIndex) and the memory-mapped
+        record array of symbol.
+        '''
+        if symbol not in self._symbols:
+            if not os.path.exists(self._path(symbol)):
+                if not self._downloaded:
+                    self._download()
+                if not os.path.exists(self._path(symbol)):
+                    raise KeyError("Symbol %s not in %s." %
+                                   (symbol, self.url))
+            rec = np.load(self._path(symbol), mmap_mode='r')
+            self._symbols[symbol] = (pd.DatetimeIndex(rec['date']), rec)
+        return self._symbols[symbol]
+
+    def get(self, symbol, start, end):
+        ''' Returns a DataFrame with column price for symbol
+        from start to end (inclusive, with the same partial date
+        string resolution as DataFrame.loc[start:end]).
+        '''
+        index, rec = self._load(symbol)
+        rows = index.slice_indexer(start, end)
+        return pd.DataFrame({'price': np.array(rec['price'][rows])},
+                            index=index[rows])
+
+
+# data source shared by all backtester instances of the process
+default_source = EikonDataSource()
+
+
+def next_event(cond):
+    ''' Returns for every bar the index of the next bar (inclusive)
+    at which the boolean array cond is True, len(cond) if there is none
+    (column by column if cond has more than one dimension).
+    '''
+    n = len(cond)
+    bars = np.arange(n).reshape((n,) + (1,) * (np.ndim(cond) - 1))
+    idx = np.where(cond, bars, n)
+    return np.minimum.accumulate(idx[::-1], axis=0)[::-1]
+
+
+# one record per fill: side is 1 (buy), -1 (sell) or 0 (close out),
+# costs are the transaction costs, cash and units_held the state after
+ledger_dtype = np.dtype([('bar', 'i8'), ('date', 'datetime64[ns]'),
+                         ('side', 'i1'), ('units', 'f8'), ('price', 'f8'),
+                         ('costs', 'f8'), ('cash', 'f8'),
+                         ('units_held', 'f8')])
+
+
 class BacktestBase(object):
     ''' Base class for event-based backtesting of trading strategies.
 
@@ -30,6 +126,12 @@ class BacktestBase(object):
         fixed transaction costs per trade (buy or sell)
     ptc: float
         proportional transaction costs per trade (buy or sell)
+    source: object
+        data source with a get(symbol, start, end) method
+        (default: the shared EikonDataSource)
+    reporter: callable
+        receives all output lines (default: print, None for silence);
+        trade lines are only reported if verbose is True
 
     Methods
     =======
@@ -37,8 +139,22 @@ class BacktestBase(object):
         retrieves and prepares the base data set
     plot_data:
         plots the closing price for the symbol
+    report:
+        passes an output line to the reporter
     print_balance:
         prints out the current (cash) balance
+    reset_ledger:
+        starts a new trade ledger (called at the start of a run)
+    ledger:
+        fills of the current run as a NumPy record array
+    equity_curve:
+        per-bar equity of the current run
+    event_arrays:
+        extracts price, timestamps and columns as NumPy arrays
+    format_date:
+        returns the date of a bar as a string
+    run_state_machine:
+        runs a position state machine from event to event
     get_date_price:
         returns the date and price for the given bar
     place_buy_order:
@@ -50,7 +166,8 @@ class BacktestBase(object):
     '''
 
     def __init__(self, symbol, start, end, amount,
-                 ftc=0.0, ptc=0.0, verbose=True):
+                 ftc=0.0, ptc=0.0, verbose=True, source=None,
+                 reporter=print):
         self.symbol = symbol
         self.start = start
         self.end = end
@@ -62,62 +179,165 @@ class BacktestBase(object):
         self.position = 0
         self.trades = 0
         self.verbose = verbose
+        self.source = source if source is not None else default_source
+        self.reporter = reporter
         self.get_data()
+        self.reset_ledger()
 
     def get_data(self):
         ''' Retrieves and prepares the data.
         '''
-        raw = pd.read_csv('http://hilpisch.com/tr_eikon_eod_data.csv',
-                          index_col=0, parse_dates=True).dropna()
-        raw = pd.DataFrame(raw[self.symbol])
-        raw = raw.loc[self.start:self.end]
-        raw.rename(columns={self.symbol: 'price'}, inplace=True)
+        raw = self.source.get(self.symbol, self.start, self.end)
         raw['returns'] = np.log(raw / raw.shift(1))
         self.data = raw.dropna()
+        self.event_arrays()
 
     def plot_data(self):
         ''' Plots the (adjusted) closing prices for symbol.
         '''
         self.data['price'].plot(figsize=(10, 6), title=self.symbol)
 
+    def report(self, msg):
+        ''' Pass an output line to the reporter (if any).
+        '''
+        if self.reporter is not None:
+            self.reporter(msg)
+
     def print_balance(self, date=''):
         ''' Print out current cash balance info.
         '''
-        print('%s | current cash balance %8d' % (date[:10], self.amount))
+        self.report('%s | current cash balance %8d' % (date[:10], self.amount))
+
+    def reset_ledger(self):
+        ''' Start a new (empty) trade ledger from the current state
+        (the opening cash and units held are kept for equity_curve).
+        '''
+        self._ledger = np.zeros(min(2 * len(self.data) + 1, 4096),
+                                dtype=ledger_dtype)
+        self._fills = 0
+        self._start_cash = self.amount
+        self._start_units = self.units
+
+    def _record(self, bar, side, units, price, costs, units_held=None):
+        ''' Append a fill to the ledger (doubling its capacity if full).
+        '''
+        if units_held is None:
+            units_held = self.units
+        if self._fills == len(self._ledger):
+            self._ledger = np.concatenate((self._ledger,
+                                           np.zeros_like(self._ledger)))
+        self._ledger[self._fills] = (bar, self._dates[bar], side, units,
+                                     price, costs, self.amount, units_held)
+        self._fills += 1
+
+    @property
+    def ledger(self):
+        return self._ledger[:self._fills]
+
+    def equity_curve(self):
+        ''' Return the per-bar equity (cash plus units held at the bar's
+        price) of the current run as a pandas Series.
+        '''
+        ledger = self.ledger
+        # state after the last fill at or before every bar
+        k = np.searchsorted(ledger['bar'], np.arange(len(self._price)),
+                            side='right')
+        cash = np.r_[self._start_cash, ledger['cash']][k]
+        units = np.r_[self._start_units, ledger['units_held']][k]
+        return pd.Series(cash + units * self._price, index=self.data.index,
+                         name='equity')
+
+    def event_arrays(self, *columns):
+        ''' Extracts the price, the timestamps and the given columns
+        of self.data into contiguous NumPy arrays for the event loop.
+        '''
+        self._price = np.ascontiguousarray(self.data['price'].values,
+                                           dtype=np.float64)
+        self._dates = self.data.index.values
+        return [np.ascontiguousarray(self.data[col].values, dtype=np.float64)
+                for col in columns]
+
+    def format_date(self, bar):
+        ''' Return the date of bar as a string (only needed for printing).
+        '''
+        return str(np.datetime_as_string(self._dates[bar], unit='D'))
+
+    def run_state_machine(self, start, transitions):
+        ''' Runs a position state machine from start to the last bar.
+
+        Instead of visiting every bar, the next bar satisfying each
+        transition condition is looked up in precomputed arrays, such
+        that the Python loop runs once per trade only.
+
+        Parameters
+        ==========
+        start: int
+            first bar of the event loop
+        transitions: dict
+            maps a position to a list of (condition, order, new position)
+            tuples with condition a boolean array over all bars and order
+            a function of the bar; on the same bar, earlier tuples take
+            precedence (as in an if/elif chain)
+
+        Returns
+        =======
+        bar: int
+            last bar of the event loop
+        '''
+        n = len(self.data)
+        events = dict((position, [(next_event(cond), order, new)
+                                  for cond, order, new in trans])
+                      for position, trans in transitions.items())
+        bar = start
+        while bar < n:
+            trans = events[self.position]
+            hits = [nxt[bar] for nxt, _, _ in trans]
+            k = int(np.argmin(hits))
+            if hits[k] >= n:
+                break
+            bar = hits[k]
+            trans[k][1](bar)
+            self.position = trans[k][2]
+            bar += 1
+        return n - 1
 
     def get_date_price(self, bar):
         ''' Return date and price for bar.
         '''
-        date = str(self.data.index[bar])
-        price = self.data.price.iloc[bar]
-        return date, price
+        return self.format_date(bar), self._price[bar]
 
     def place_buy_order(self, bar, units=None, amount=None):
         ''' Place a buy order.
         '''
-        date, price = self.get_date_price(bar)
+        price = self._price[bar]
         if units is None:
             units = math.floor(amount / price)
         self.amount -= (units * price) * (1 + self.ptc) + self.ftc
         self.units += units
         self.trades += 1
-        if self.verbose:
-            print('%s | buying  %4d units at %7.2f' %
-                  (date[:10], units, price))
+        self._record(bar, 1, units, price,
+                     units * price * self.ptc + self.ftc)
+        if self.verbose and self.reporter is not None:
+            date = self.format_date(bar)
+            self.report('%s | buying  %4d units at %7.2f' %
+                        (date[:10], units, price))
             self.print_balance(date)
 
     def place_sell_order(self, bar, units=None, amount=None):
         ''' Place a sell order.
         '''
-        date, price = self.get_date_price(bar)
+        price = self._price[bar]
         if units is None:
             units = math.floor(amount / price)
         self.amount += (units * price) * (1 - self.ptc) - self.ftc
         self.units -= units
         self.trades += 1
-        if self.verbose:
-            print('%s | selling %4d units at %7.2f' %
-                  (date[:10], units, price))
+        self._record(bar, -1, units, price,
+                     units * price * self.ptc + self.ftc)
+        if self.verbose and self.reporter is not None:
+            date = self.format_date(bar)
+            self.report('%s | selling %4d units at %7.2f' %
+                        (date[:10], units, price))
             self.print_balance(date)
 
     def close_out(self, bar):
@@ -125,15 +345,20 @@ class BacktestBase(object):
         '''
         date, price = self.get_date_price(bar)
         self.amount += self.units * price
+        # the ledger records the liquidated position as flat
+        self._record(bar, 0, self.units, price, 0.0, units_held=0)
+        if self.reporter is None:
+            return
         if self.verbose:
-            print('%s | inventory %d units at %.2f' % (date[:10],
-                                                       self.units, price))
-            print('=' * 55)
-        print('Final balance   [$] %13.2f' % self.amount)
-        print('Net Performance [%%] %13.2f' % (
-                (self.amount - self.initial_amount) /
-                 self.initial_amount * 100))
-        print('=' * 55)
+            self.report('%s | inventory %d units at %.2f' % (date[:10],
+                                                             self.units,
+                                                             price))
+            self.report('=' * 55)
+        self.report('Final balance   [$] %13.2f' % self.amount)
+        self.report('Net Performance [%%] %13.2f' % (
+                    (self.amount - self.initial_amount) /
+                    self.initial_amount * 100))
+        self.report('=' * 55)
 
 
 # if __name__ == '__main__':
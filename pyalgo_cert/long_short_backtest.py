@@ -6,7 +6,7 @@
 # (c) Dr. Yves J. Hilpisch
 # The Python Quants GmbH
 #
-from BacktestBase import *
+from event_based_backtesting import *
 
 
 class BacktestLongShort(BacktestBase):
@@ -31,78 +31,126 @@ class BacktestLongShort(BacktestBase):
                 amount = self.amount
             self.place_sell_order(bar, amount=amount)
 
-    def run_sma_strategy(self, SMA1, SMA2):
+    def _flip_transitions(self, long_signal, short_signal):
+        ''' Transitions of the always-invested strategies: from neutral
+        only a long position can be entered (as in the bar loops).
+        '''
+        def go_long(bar):
+            self.go_long(bar, amount='all')
+
+        def go_short(bar):
+            self.go_short(bar, amount='all')
+        return {0: [(long_signal, go_long, 1)],
+                -1: [(long_signal, go_long, 1)],
+                1: [(short_signal, go_short, -1)]}
+
+    def run_sma_strategy(self, SMA1, SMA2, backend='python'):
         msg = '\n\nRunning SMA strategy | SMA1 = %d & SMA2 = %d' % (SMA1, SMA2)
         msg += '\nFixed costs %.2f | ' % self.ftc
         msg += 'proportional costs %.4f' % self.ptc
-        print(msg)
-        print('=' * 55)
+        self.report(msg)
+        self.report('=' * 55)
         self.position = 0  # initial neutral position
         self.amount = self.initial_amount  # reset initial capital
+        self.units = 0  # no units held
+        self.trades = 0  # no trades yet
+        self.reset_ledger()
         self.data['SMA1'] = self.data['price'].rolling(SMA1).mean()
         self.data['SMA2'] = self.data['price'].rolling(SMA2).mean()
 
+        sma1, sma2 = self.event_arrays('SMA1', 'SMA2')
+
+        if backend == 'numpy':
+            bar = self.run_state_machine(SMA2, self._flip_transitions(
+                sma1 > sma2, sma1 < sma2))
+            self.close_out(bar)
+            return
         for bar in range(SMA2, len(self.data)):
             if self.position in [0, -1]:
-                if self.data['SMA1'].iloc[bar] > self.data['SMA2'].iloc[bar]:
+                if sma1[bar] > sma2[bar]:
                     self.go_long(bar, amount='all')
                     self.position = 1  # long position
             elif self.position in [0, 1]:
-                if self.data['SMA1'].iloc[bar] < self.data['SMA2'].iloc[bar]:
+                if sma1[bar] < sma2[bar]:
                     self.go_short(bar, amount='all')
                     self.position = -1  # short position
         self.close_out(bar)
 
-    def run_momentum_strategy(self, momentum):
+    def run_momentum_strategy(self, momentum, backend='python'):
         msg = '\n\nRunning momentum strategy | %d days' % momentum
         msg += '\nFixed costs %.2f | ' % self.ftc
         msg += 'proportional costs %.4f' % self.ptc
-        print(msg)
-        print('=' * 55)
+        self.report(msg)
+        self.report('=' * 55)
         self.position = 0  # initial neutral position
         self.amount = self.initial_amount  # reset initial capital
+        self.units = 0  # no units held
+        self.trades = 0  # no trades yet
+        self.reset_ledger()
 
         self.data['momentum'] = self.data['returns'].rolling(momentum).mean()
+        mom, = self.event_arrays('momentum')
 
+        if backend == 'numpy':
+            bar = self.run_state_machine(momentum, self._flip_transitions(
+                mom > 0, mom <= 0))
+            self.close_out(bar)
+            return
         for bar in range(momentum, len(self.data)):
             if self.position in [0, -1]:
-                if self.data['momentum'].iloc[bar] > 0:
+                if mom[bar] > 0:
                     self.go_long(bar, amount='all')
                     self.position = 1  # long position
             elif self.position in [0, 1]:
-                if self.data['momentum'].iloc[bar] <= 0:
+                if mom[bar] <= 0:
                     self.go_short(bar, amount='all')
                     self.position = -1  # long position
         self.close_out(bar)
 
-    def run_mean_reversion_strategy(self, SMA, threshold):
+    def run_mean_reversion_strategy(self, SMA, threshold, backend='python'):
         msg = '\n\nRunning mean reversion strategy | SMA %d & thr %d' \
             % (SMA, threshold)
         msg += '\nFixed costs %.2f | ' % self.ftc
         msg += 'proportional costs %.4f' % self.ptc
-        print(msg)
-        print('=' * 55)
+        self.report(msg)
+        self.report('=' * 55)
         self.position = 0  # initial neutral position
         self.amount = self.initial_amount  # reset initial capital
+        self.units = 0  # no units held
+        self.trades = 0  # no trades yet
+        self.reset_ledger()
 
         self.data['SMA'] = self.data['price'].rolling(SMA).mean()
+        price, sma = self.event_arrays('price', 'SMA')
 
+        if backend == 'numpy':
+            bar = self.run_state_machine(SMA, {
+                0: [(price < sma - threshold,
+                     lambda bar: self.go_long(
+                         bar, amount=self.initial_amount), 1),
+                    (price > sma + threshold,
+                     lambda bar: self.go_short(
+                         bar, amount=self.initial_amount), -1)],
+                1: [(price >= sma, lambda bar: self.place_sell_order(
+                    bar, units=self.units), 0)],
+                -1: [(price <= sma, lambda bar: self.place_buy_order(
+                    bar, units=-self.units), 0)]})
+            self.close_out(bar)
+            return
         for bar in range(SMA, len(self.data)):
             if self.position == 0:
-                if (self.data['price'].iloc[bar] <
-                        self.data['SMA'].iloc[bar] - threshold):
+                if price[bar] < sma[bar] - threshold:
                     self.go_long(bar, amount=self.initial_amount)
                     self.position = 1
-                elif (self.data['price'].iloc[bar] >
-                        self.data['SMA'].iloc[bar] + threshold):
+                elif price[bar] > sma[bar] + threshold:
                     self.go_short(bar, amount=self.initial_amount)
                     self.position = -1
             elif self.position == 1:
-                if self.data['price'].iloc[bar] >= self.data['SMA'].iloc[bar]:
+                if price[bar] >= sma[bar]:
                     self.place_sell_order(bar, units=self.units)
                     self.position = 0
             elif self.position == -1:
-                if self.data['price'].iloc[bar] <= self.data['SMA'].iloc[bar]:
+                if price[bar] <= sma[bar]:
                     self.place_buy_order(bar, units=-self.units)
                     self.position = 0
         self.close_out(bar)
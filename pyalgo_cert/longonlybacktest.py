@@ -11,65 +11,96 @@ from event_based_backtesting import *
 
 class BacktestLongOnly(BacktestBase):
 
-    def run_sma_strategy(self, SMA1, SMA2):
+    def _buy_all(self, bar):
+        self.place_buy_order(bar, amount=self.amount)
+
+    def _sell_all(self, bar):
+        self.place_sell_order(bar, units=self.units)
+
+    def run_sma_strategy(self, SMA1, SMA2, backend='python'):
         ''' Backtesting a SMA-based strategy.
 
         Parameters
         ==========
         SMA1, SMA2: int
             shorter and longer term simple moving average (in days)
+        backend: str
+            'python' (bar by bar) or 'numpy' (event to event)
         '''
         msg = '\n\nRunning SMA strategy | SMA1 = %d & SMA2 = %d' % (SMA1, SMA2)
         msg += '\nfixed costs %.2f | ' % self.ftc
         msg += 'proportional costs %.4f' % self.ptc
-        print(msg)
-        print('=' * 55)
+        self.report(msg)
+        self.report('=' * 55)
         self.position = 0  # initial neutral position
         self.amount = self.initial_amount  # reset initial capital
+        self.units = 0  # no units held
+        self.trades = 0  # no trades yet
+        self.reset_ledger()
         self.data['SMA1'] = self.data['price'].rolling(SMA1).mean()
         self.data['SMA2'] = self.data['price'].rolling(SMA2).mean()
 
+        sma1, sma2 = self.event_arrays('SMA1', 'SMA2')
+
+        if backend == 'numpy':
+            bar = self.run_state_machine(SMA2, {
+                0: [(sma1 > sma2, self._buy_all, 1)],
+                1: [(sma1 < sma2, self._sell_all, 0)]})
+            self.close_out(bar)
+            return
         for bar in range(SMA2, len(self.data)):
             if self.position == 0:
-                if self.data['SMA1'].iloc[bar] > self.data['SMA2'].iloc[bar]:
+                if sma1[bar] > sma2[bar]:
                     self.place_buy_order(bar, amount=self.amount)
                     self.position = 1  # long position
             elif self.position == 1:
-                if self.data['SMA1'].iloc[bar] < self.data['SMA2'].iloc[bar]:
+                if sma1[bar] < sma2[bar]:
                     self.place_sell_order(bar, units=self.units)
                     self.position = 0  # market neutral
         self.close_out(bar)
 
-    def run_momentum_strategy(self, momentum):
+    def run_momentum_strategy(self, momentum, backend='python'):
         ''' Backtesting a momentum-based strategy.
 
         Parameters
         ==========
         momentum: int
             number of days for mean return calculation
+        backend: str
+            'python' (bar by bar) or 'numpy' (event to event)
         '''
         msg = '\n\nRunning momentum strategy | %d days' % momentum
         msg += '\nfixed costs %.2f | ' % self.ftc
         msg += 'proportional costs %.4f' % self.ptc
-        print(msg)
-        print('=' * 55)
+        self.report(msg)
+        self.report('=' * 55)
         self.position = 0  # initial neutral position
         self.amount = self.initial_amount  # reset initial capital
+        self.units = 0  # no units held
+        self.trades = 0  # no trades yet
+        self.reset_ledger()
 
         self.data['momentum'] = self.data['returns'].rolling(momentum).mean()
+        mom, = self.event_arrays('momentum')
 
+        if backend == 'numpy':
+            bar = self.run_state_machine(momentum, {
+                0: [(mom > 0, self._buy_all, 1)],
+                1: [(mom <= 0, self._sell_all, 0)]})
+            self.close_out(bar)
+            return
         for bar in range(momentum, len(self.data)):
             if self.position == 0:
-                if self.data['momentum'].iloc[bar] > 0:
+                if mom[bar] > 0:
                     self.place_buy_order(bar, amount=self.amount)
                     self.position = 1  # long position
             elif self.position == 1:
-                if self.data['momentum'].iloc[bar] <= 0:
+                if mom[bar] <= 0:
                     self.place_sell_order(bar, units=self.units)
                     self.position = 0  # market neutral
         self.close_out(bar)
 
-    def run_mean_reversion_strategy(self, SMA, threshold):
+    def run_mean_reversion_strategy(self, SMA, threshold, backend='python'):
         ''' Backtesting a mean reversion-based strategy.
 
         Parameters
@@ -78,26 +109,37 @@ class BacktestLongOnly(BacktestBase):
             simple moving average in days
         threshold: float
             absolute value for deviation-based signal relative to SMA
+        backend: str
+            'python' (bar by bar) or 'numpy' (event to event)
         '''
         msg = '\n\nRunning mean reversion strategy | SMA %d & thr %d' \
             % (SMA, threshold)
         msg += '\nfixed costs %.2f | ' % self.ftc
         msg += 'proportional costs %.4f' % self.ptc
-        print(msg)
-        print('=' * 55)
+        self.report(msg)
+        self.report('=' * 55)
         self.position = 0
         self.amount = self.initial_amount
+        self.units = 0  # no units held
+        self.trades = 0  # no trades yet
+        self.reset_ledger()
 
         self.data['SMA'] = self.data['price'].rolling(SMA).mean()
+        price, sma = self.event_arrays('price', 'SMA')
 
+        if backend == 'numpy':
+            bar = self.run_state_machine(SMA, {
+                0: [(price < sma - threshold, self._buy_all, 1)],
+                1: [(price >= sma, self._sell_all, 0)]})
+            self.close_out(bar)
+            return
         for bar in range(SMA, len(self.data)):
             if self.position == 0:
-                if (self.data['price'].ix[bar] <
-                        self.data['SMA'].ix[bar] - threshold):
+                if price[bar] < sma[bar] - threshold:
                     self.place_buy_order(bar, amount=self.amount)
                     self.position = 1
             elif self.position == 1:
-                if self.data['price'].iloc[bar] >= self.data['SMA'].iloc[bar]:
+                if price[bar] >= sma[bar]:
                     self.place_sell_order(bar, units=self.units)
                     self.position = 0
         self.close_out(bar)
@@ -0,0 +1,306 @@
+#
+# Python Script with Portfolio Class
+# for Event-based Backtesting
+#
+# Python for Algorithmic Trading
+# (c) Dr. Yves J. Hilpisch
+# The Python Quants GmbH
+#
+from event_based_backtesting import *
+
+
+# ledger record with the index of the traded asset
+portfolio_ledger_dtype = np.dtype([('asset', 'i4')] +
+                                  [(name, ledger_dtype[name])
+                                   for name in ledger_dtype.names])
+
+
+class BacktestPortfolio(object):
+    ''' Class for event-based backtesting of long-only strategies
+    on many symbols with a shared cash balance.
+
+    Prices are held in one 2-D block (bars x symbols); on every bar all
+    orders are executed as vectorized cross-sectional operations.
+
+    Attributes
+    ==========
+    symbols: list
+        TR RICs (financial instruments) to be used
+    start: str
+        start date for data selection
+    end: str
+        end date for data selection
+    amount: float
+        initial cash shared by all symbols
+    ftc: float
+        fixed transaction costs per trade (buy or sell)
+    ptc: float
+        proportional transaction costs per trade (buy or sell)
+    source: object
+        data source with a get(symbol, start, end) method
+        (default: the shared EikonDataSource)
+    reporter: callable
+        receives all output lines (default: print, None for silence);
+        trade lines are only reported if verbose is True
+
+    Methods
+    =======
+    get_data:
+        retrieves and aligns the prices of all symbols
+    report:
+        passes an output line to the reporter
+    reset:
+        resets cash, positions and the ledger
+    ledger:
+        fills of the current run as a NumPy record array
+    place_orders:
+        executes signed orders for all symbols at a bar
+    close_out:
+        closes out all positions
+    run_strategy:
+        runs a long/flat strategy given entry and exit signals
+    run_sma_strategy:
+        SMA crossover strategy on every symbol
+    run_momentum_strategy:
+        momentum strategy on every symbol
+    run_mean_reversion_strategy:
+        mean reversion strategy on every symbol
+    '''
+
+    def __init__(self, symbols, start, end, amount,
+                 ftc=0.0, ptc=0.0, verbose=True, source=None,
+                 reporter=print):
+        self.symbols = list(symbols)
+        self.start = start
+        self.end = end
+        self.initial_amount = amount
+        self.amount = amount
+        self.ftc = ftc
+        self.ptc = ptc
+        self.trades = 0
+        self.verbose = verbose
+        self.source = source if source is not None else default_source
+        self.reporter = reporter
+        self.get_data()
+        self.reset()
+
+    def get_data(self):
+        ''' Retrieves the prices of all symbols on their common dates.
+        '''
+        prices = [self.source.get(symbol, self.start, self.end)['price']
+                  for symbol in self.symbols]
+        raw = pd.concat(prices, axis=1, join='inner', keys=self.symbols)
+        self.returns = np.log(raw / raw.shift(1)).iloc[1:]
+        self.data = raw.iloc[1:]
+        self._price = np.ascontiguousarray(self.data.values,
+                                           dtype=np.float64)
+        self._dates = self.data.index.values
+
+    def report(self, msg):
+        ''' Pass an output line to the reporter (if any).
+        '''
+        if self.reporter is not None:
+            self.reporter(msg)
+
+    def reset(self):
+        ''' Resets cash, positions and the ledger for a new run.
+        '''
+        n = len(self.symbols)
+        self.amount = self.initial_amount
+        self.units = np.zeros(n)
+        self.position = np.zeros(n, dtype=np.int8)
+        self._ledger = np.zeros(4096, dtype=portfolio_ledger_dtype)
+        self._fills = 0
+        self.equity = pd.Series(self.amount, index=self.data.index,
+                                name='equity')
+
+    def _record(self, bar, assets, side, units, price, costs, units_held):
+        ''' Appends the fills of one bar to the ledger.
+        '''
+        k = len(assets)
+        while self._fills + k > len(self._ledger):
+            self._ledger = np.concatenate((self._ledger,
+                                           np.zeros_like(self._ledger)))
+        rec = self._ledger[self._fills:self._fills + k]
+        rec['asset'] = assets
+        rec['bar'] = bar
+        rec['date'] = self._dates[bar]
+        rec['side'] = side
+        rec['units'] = units
+        rec['price'] = price
+        rec['costs'] = costs
+        rec['cash'] = self.amount
+        rec['units_held'] = units_held
+        self._fills += k
+
+    @property
+    def ledger(self):
+        return self._ledger[:self._fills]
+
+    def place_orders(self, bar, units):
+        ''' Executes the signed orders units (one per symbol, positive
+        to buy, negative to sell) at the prices of bar.
+        '''
+        assets = np.flatnonzero(units)
+        if len(assets) == 0:
+            return
+        units = units[assets]
+        price = self._price[bar, assets]
+        value = units * price
+        costs = np.abs(value) * self.ptc + self.ftc
+        # same arithmetic as BacktestBase.place_buy/sell_order
+        self.amount -= (value * (1 + np.sign(units) * self.ptc) +
+                        self.ftc).sum()
+        self.units[assets] += units
+        self.trades += len(assets)
+        self._record(bar, assets, np.sign(units), np.abs(units), price,
+                     costs, self.units[assets])
+        if self.verbose and self.reporter is not None:
+            date = str(np.datetime_as_string(self._dates[bar], unit='D'))
+            for a, u, p in zip(assets, units, price):
+                self.report('%s | %-8s %s %4d units at %7.2f' % (
+                    date, self.symbols[a],
+                    'buying ' if u > 0 else 'selling', abs(u), p))
+            self.report('%s | current cash balance %8d' % (date,
+                                                           self.amount))
+
+    def close_out(self, bar):
+        ''' Closing out all positions.
+        '''
+        assets = np.flatnonzero(self.units)
+        price = self._price[bar, assets]
+        self.amount += np.dot(self.units[assets], price)
+        self._record(bar, assets, 0, self.units[assets], price, 0.0, 0.0)
+        if self.reporter is None:
+            return
+        if self.verbose:
+            self.report('=' * 55)
+        self.report('Final balance   [$] %13.2f' % self.amount)
+        self.report('Net Performance [%%] %13.2f' % (
+                    (self.amount - self.initial_amount) /
+                    self.initial_amount * 100))
+        self.report('=' * 55)
+
+    def run_strategy(self, entries, exits, start):
+        ''' Runs a long/flat strategy on every symbol.
+
+        A flat symbol goes long when entries is True and a long symbol
+        goes flat when exits is True. The cash available at a bar is
+        split equally over the symbols that are flat at that bar; exits
+        are executed before entries. A symbol whose share does not buy
+        a single unit stays flat.
+
+        The next actionable bar of every symbol (entry when flat, exit
+        when long) is looked up in precomputed arrays, such that only
+        bars with at least one order are visited.
+
+        Parameters
+        ==========
+        entries, exits: array
+            boolean signals of shape (bars, symbols)
+        start: int
+            first bar of the event loop
+        '''
+        self.reset()
+        n, m = self._price.shape
+        price = self._price
+        equity = np.empty(n)
+        # next entry/exit signal of every symbol from every bar on
+        # (with a last row for the bar after the end)
+        next_entry = np.vstack((next_event(entries),
+                                np.full((1, m), n)))
+        next_exit = np.vstack((next_event(exits), np.full((1, m), n)))
+        pending = next_entry[min(start, n)].copy()
+        last = 0
+        while True:
+            bar = pending.min() if m else n
+            if bar >= n:
+                break
+            equity[last:bar] = self.amount + np.dot(price[last:bar],
+                                                    self.units)
+            act = pending == bar
+            long = self.position == 1
+            sells = act & long
+            buys = act & ~long
+            orders = np.zeros(m)
+            if sells.any():
+                orders[sells] = -self.units[sells]
+                self.place_orders(bar, orders)
+                self.position[sells] = 0
+                orders[sells] = 0
+            if buys.any():
+                cash = self.amount / (m - long.sum() + sells.sum())
+                orders[buys] = np.floor(cash / price[bar, buys])
+                self.place_orders(bar, orders)
+                # only symbols with a fill are long
+                self.position[orders > 0] = 1
+            last = bar
+            pending[act] = np.where(self.position[act] == 1,
+                                    next_exit[bar + 1, act],
+                                    next_entry[bar + 1, act])
+        equity[last:] = self.amount + np.dot(price[last:], self.units)
+        self.equity = pd.Series(equity, index=self.data.index, name='equity')
+        self.close_out(n - 1)
+
+    def _header(self, msg):
+        msg += '\nfixed costs %.2f | ' % self.ftc
+        msg += 'proportional costs %.4f' % self.ptc
+        self.report(msg)
+        self.report('=' * 55)
+
+    def run_sma_strategy(self, SMA1, SMA2):
+        ''' Backtesting a SMA-based strategy on every symbol.
+
+        Parameters
+        ==========
+        SMA1, SMA2: int
+            shorter and longer term simple moving average (in days)
+        '''
+        self._header('\n\nRunning SMA strategy | SMA1 = %d & SMA2 = %d'
+                     % (SMA1, SMA2))
+        sma1 = self.data.rolling(SMA1).mean().values
+        sma2 = self.data.rolling(SMA2).mean().values
+        self.run_strategy(sma1 > sma2, sma1 < sma2, SMA2)
+
+    def run_momentum_strategy(self, momentum):
+        ''' Backtesting a momentum-based strategy on every symbol.
+
+        Parameters
+        ==========
+        momentum: int
+            number of days for mean return calculation
+        '''
+        self._header('\n\nRunning momentum strategy | %d days' % momentum)
+        mom = self.returns.rolling(momentum).mean().values
+        self.run_strategy(mom > 0, mom <= 0, momentum)
+
+    def run_mean_reversion_strategy(self, SMA, threshold):
+        ''' Backtesting a mean reversion-based strategy on every symbol.
+
+        Parameters
+        ==========
+        SMA: int
+            simple moving average in days
+        threshold: float
+            absolute value for deviation-based signal relative to SMA
+        '''
+        self._header('\n\nRunning mean reversion strategy | SMA %d & thr %d'
+                     % (SMA, threshold))
+        price = self._price
+        sma = self.data.rolling(SMA).mean().values
+        self.run_strategy(price < sma - threshold, price >= sma, SMA)
+
+
+if __name__ == '__main__':
+    def run_strategies():
+        pfbt.run_sma_strategy(42, 252)
+        pfbt.run_momentum_strategy(60)
+        pfbt.run_mean_reversion_strategy(50, 5)
+    symbols = ['AAPL.O', 'MSFT.O', 'INTC.O', 'AMZN.O', 'GS.N']
+    pfbt = BacktestPortfolio(symbols, '2010-1-1', '2018-06-29', 50000,
+                             verbose=False)
+    run_strategies()
+    # transaction costs: 10 USD fix, 1% variable
+    pfbt = BacktestPortfolio(symbols, '2010-1-1', '2018-06-29',
+                             50000, 10.0, 0.01, False)
+    run_strategies()